@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+
+RECORD = np.dtype([("time", "<f8"), ("id", "<u4"), ("value", "<f8")]) # Fixed width record, 20 bytes
+DATA_FILE = "log.bin" # Records of every variable
+VARIABLES_FILE = "variables.txt" # id;name lines
+
+class BinarySink():
+	"""
+	Binary Sink Class
+	Appends (timestamp, variable_id, value) fixed width records to one file per log folder
+	"""
+	def __init__(self, path):
+
+		self.__path = path
+		self.__ids = dict() # Variable name -> id
+		self.__data = None
+		self.__variables = None
+
+	def write(self, records):
+		"""
+		Appends records to the data file
+		@ records list: (key, timestamp, value) tuples
+		"""
+		if self.__data is None:
+			self.__data = open(os.path.join(self.__path, DATA_FILE), "ab")
+			self.__variables = open(os.path.join(self.__path, VARIABLES_FILE), "a")
+
+		data = np.empty(len(records), dtype=RECORD)
+
+		for idx, (key, stamp, value) in enumerate(records):
+			if not key in self.__ids:
+				self.__ids[key] = len(self.__ids)
+				self.__variables.write(str(self.__ids[key])+";"+str(key)+'\n')
+
+			data[idx] = (stamp, self.__ids[key], value)
+
+		data.tofile(self.__data)
+
+	def flush(self):
+		"""
+		Flushes the open files
+		"""
+		if self.__data is not None:
+			self.__variables.flush()
+			self.__data.flush()
+
+	def close(self):
+		"""
+		Closes the open files
+		"""
+		if self.__data is not None:
+			self.__variables.close()
+			self.__data.close()
+			self.__data = None
+			self.__variables = None
+
+class BinaryLogReader():
+	"""
+	Binary Log Reader Class
+	Memory maps a binary log folder and returns NumPy arrays per variable
+	"""
+	def __init__(self, path):
+
+		self.__ids = dict() # Variable name -> id
+
+		with open(os.path.join(path, VARIABLES_FILE)) as variables:
+			for line in variables:
+				if ";" in line:
+					var_id, name = line.rstrip('\n').split(";", 1)
+					self.__ids[name] = int(var_id)
+
+		filename = os.path.join(path, DATA_FILE)
+		if os.path.getsize(filename) >= RECORD.itemsize:
+			self.__records = np.memmap(filename, dtype=RECORD, mode="r")
+		else:
+			self.__records = np.zeros(0, dtype=RECORD)
+
+	def get_variables(self):
+		"""
+		Returns the logged variable names
+		"""
+		return list(self.__ids.keys())
+
+	def get(self, name, start=None, end=None):
+		"""
+		Returns the records of a variable
+		@ name str: variable name
+		@ start float: first timestamp included, None from the beginning
+		@ end float: first timestamp excluded, None until the end
+		@ returns tuple: timestamp array and value array
+		"""
+		mask = self.__records["id"] == self.__ids[name]
+
+		if start is not None:
+			mask &= self.__records["time"] >= start
+		if end is not None:
+			mask &= self.__records["time"] < end
+
+		records = self.__records[mask]
+
+		return np.array(records["time"]), np.array(records["value"])
+
+	def get_all(self, start=None, end=None):
+		"""
+		Returns the records of every variable
+		@ returns dict: variable name -> (timestamp array, value array)
+		"""
+		return {name: self.get(name, start, end) for name in self.__ids}
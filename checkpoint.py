@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+
+# Evolution kinds
+HV = 0 # Homeostatic Variable evolution, owner and id are the Homeostatic Variable id
+EFFECT = 1 # Effect evolution, owner is the Homeostatic Variable id and id the Effect id
+ACTIVATION = 2 # State following its activation parameters, owner and id are the State id
+DEACTIVATION = 3 # State following its deactivation parameters, owner and id are the State id
+
+# Entity kinds
+AGENT = 0
+STIMULUS = 1
+
+EVOLUTION = np.dtype([("kind", "u1"), ("owner", "<i8"), ("id", "<i8"), ("value", "<f8"), ("fn_time", "<f8"), ("evolving", "?")])
+CURRENT_STATE = np.dtype([("kind", "u1"), ("id", "<i8"), ("state", "<i8")]) # State -1 if there is none
+NONE = -1 # Missing id
+
+class Checkpoint():
+	"""
+	Checkpoint Class
+	Binary file with the runtime state of the model, written atomically
+	"""
+	def __init__(self, path):
+		"""
+		@ path str: checkpoint file
+		"""
+		self.__path = path
+
+	def exists(self):
+		"""
+		Returns True if a checkpoint has been written
+		"""
+		return os.path.isfile(self.__path)
+
+	def save(self, evolutions, current_states, active_actions, dominant):
+		"""
+		Writes the checkpoint into a temporary file and renames it over the previous one
+		@ evolutions array: EVOLUTION records
+		@ current_states array: CURRENT_STATE records
+		@ active_actions list: active action ids
+		@ dominant list: current, previous and saved previous dominant motivation ids, NONE if missing
+		"""
+		folder = os.path.dirname(self.__path)
+		if folder and not os.path.isdir(folder):
+			os.makedirs(folder)
+
+		tmp = self.__path + ".tmp"
+		with open(tmp, "wb") as checkpoint_file:
+			np.savez(checkpoint_file, evolutions=evolutions, current_states=current_states,
+				active_actions=np.array(sorted(active_actions), dtype=np.int64), dominant=np.array(dominant, dtype=np.int64))
+			checkpoint_file.flush()
+			os.fsync(checkpoint_file.fileno())
+
+		os.rename(tmp, self.__path)
+
+	def load(self):
+		"""
+		Reads the checkpoint
+		@ returns tuple: evolution records, current state records, active action ids and dominant motivation ids
+		"""
+		with np.load(self.__path) as data:
+			return data["evolutions"], data["current_states"], [int(x) for x in data["active_actions"]], [int(x) for x in data["dominant"]]
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import rospy
+from time import time
+
+class WallClock():
+	"""
+	Wall Clock Class
+	Real time clock used when the model runs on the robot
+	"""
+	def now(self):
+		"""
+		Returns current time in seconds
+		"""
+		return time()
+
+	def sleep(self, duration):
+		"""
+		Sleeps the given number of seconds
+		@ duration float: seconds
+		"""
+		rospy.sleep(duration)
+
+	def advance_to(self, instant):
+		"""
+		Real time cannot be advanced. Sleeps until the given instant
+		@ instant float: time in seconds
+		"""
+		self.sleep(max(instant - self.now(), 0))
+
+	def is_simulated(self):
+		"""
+		Returns True if time advances without waiting
+		"""
+		return False
+
+class SimulatedClock():
+	"""
+	Simulated Clock Class
+	Virtual clock that jumps to the next instant as fast as the CPU allows
+	"""
+	def __init__(self, start=0.0):
+
+		self.__now = start # Current virtual time in seconds
+
+	def now(self):
+		"""
+		Returns current virtual time in seconds
+		"""
+		return self.__now
+
+	def sleep(self, duration):
+		"""
+		Advances the virtual time the given number of seconds
+		@ duration float: seconds
+		"""
+		self.advance_to(self.__now + duration)
+
+	def advance_to(self, instant):
+		"""
+		Advances the virtual time to the given instant. Time never goes back
+		@ instant float: time in seconds
+		"""
+		if instant > self.__now:
+			self.__now = instant
+
+	def is_simulated(self):
+		"""
+		Returns True if time advances without waiting
+		"""
+		return True
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+KINDS = ["hv", "sta", "eff", "act", "ag", "sti", "mot"] # Resolved configuration lists
+
+class ConfigDiff():
+    """
+    Config Diff Class
+    Differences between two configurations resolved by the Resolver,
+    compared row by row through their ids
+    """
+    def __init__(self, old, new):
+        """
+        @ old dict: configuration of the live object graph
+        @ new dict: configuration read from the database
+        """
+        self.__added = dict() # Kind -> ids only in the new configuration
+        self.__removed = dict() # Kind -> ids only in the old configuration
+        self.__changed = dict() # Kind -> id -> names of the changed fields
+
+        for kind in KINDS:
+            old_rows = dict((row["id"], row) for row in old[kind])
+            new_rows = dict((row["id"], row) for row in new[kind])
+
+            self.__added[kind] = [id for id in new_rows if not id in old_rows]
+            self.__removed[kind] = [id for id in old_rows if not id in new_rows]
+            self.__changed[kind] = dict()
+
+            for id, row in new_rows.items():
+                if id in old_rows and row != old_rows[id]:
+                    keys = set(row.keys()) | set(old_rows[id].keys())
+                    self.__changed[kind][id] = set(key for key in keys if row.get(key) != old_rows[id].get(key))
+
+    def get_added(self, kind):
+        """
+        Returns the ids of the new rows
+        @ kind str: configuration list
+        """
+        return self.__added[kind]
+
+    def get_removed(self, kind):
+        """
+        Returns the ids of the removed rows
+        @ kind str: configuration list
+        """
+        return self.__removed[kind]
+
+    def get_changed(self, kind):
+        """
+        Returns the changed rows
+        @ kind str: configuration list
+        @ returns dict: id -> names of the changed fields
+        """
+        return self.__changed[kind]
+
+    def is_empty(self):
+        """
+        Returns True if both configurations are equal
+        """
+        for kind in KINDS:
+            if self.__added[kind] or self.__removed[kind] or self.__changed[kind]:
+                return False
+
+        return True
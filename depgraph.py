@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from motivational_model.classes.engine import engine
+from motivational_model.classes.snapshot import snapshot
+from motivational_model.classes.motivation import ALPHA
+
+RESYNC_TICKS = 1000 # Ticks between full rereads of every value
+
+class DependencyGraph():
+	"""
+	Dependency Graph Class
+	Relates Homeostatic Variables and States with the Motivations using them.
+	Relations are compiled into sparse averaging matrices, so every intensity
+	is computed at once from the vectors of deficits and state values.
+	Only the values affected by changed evolutions are read again.
+	"""
+	def __init__(self, motivations, resync_ticks=RESYNC_TICKS):
+
+		self.__motivations = motivations
+		self.__resync_ticks = resync_ticks
+		self.__ticks = 0
+
+		self.__hvs = list() # Homeostatic Variables used by any Motivation
+		self.__states = list() # States used by any Motivation
+		self.__hv_index = dict() # Homeostatic Variable -> position in the deficit vector
+		self.__state_index = dict() # State -> position in the state value vector
+
+		hv_entries = list() # (motivation position, hv position, weight)
+		es_entries = list() # (motivation position, state position, weight)
+
+		for idx, mot in enumerate(motivations):
+			related_hv = mot.get_related_hv()
+			for hv in related_hv:
+				hv_entries.append((idx, self.__add(hv, self.__hvs, self.__hv_index), 1.0/len(related_hv)))
+
+			related_sti = mot.get_related_sti()
+			for sti in related_sti:
+				for state in sti.get_states():
+					es_entries.append((idx, self.__add(state, self.__states, self.__state_index), 1.0/len(related_sti)))
+
+			related_ag = mot.get_related_ag()
+			for ag in related_ag:
+				for state in ag.get_states():
+					es_entries.append((idx, self.__add(state, self.__states, self.__state_index), 1.0/len(related_ag)))
+
+		# Averaging matrices
+		self.__hv_matrix = self.__compile(hv_entries, len(self.__hvs))
+		self.__es_matrix = self.__compile(es_entries, len(self.__states))
+
+		# Value vectors
+		self.__hv_values = np.zeros(len(self.__hvs))
+		self.__state_values = np.zeros(len(self.__states))
+
+		self.__thresholds = np.array([mot.get_threshold() for mot in motivations], dtype=np.float64)
+		self.__intensities = np.zeros(len(motivations))
+
+		self.resync()
+
+	def __add(self, entity, entities, index):
+		"""
+		Adds an entity to its value vector once
+		@ entities list: entities of the vector
+		@ index dict: entity -> position
+		@ returns int: position of the entity
+		"""
+		if not entity in index:
+			index[entity] = len(entities)
+			entities.append(entity)
+
+		return index[entity]
+
+	def __compile(self, entries, columns):
+		"""
+		Builds a CSR matrix. Repeated entries are added up
+		@ entries list: (row, column, weight) tuples
+		@ columns int: number of columns
+		"""
+		rows = [e[0] for e in entries]
+		cols = [e[1] for e in entries]
+		data = [e[2] for e in entries]
+
+		return csr_matrix((data, (rows, cols)), shape=(len(self.__motivations), columns))
+
+	def get_intensities(self):
+		"""
+		Returns the intensity of every Motivation in list order
+		"""
+		return self.__intensities
+
+	def get_thresholds(self):
+		"""
+		Returns the threshold of every Motivation in list order
+		"""
+		return self.__thresholds
+
+	def resync(self):
+		"""
+		Reads every value again and recomputes every intensity
+		"""
+		for idx, hv in enumerate(self.__hvs):
+			self.__hv_values[idx] = hv.get_hv_value()
+
+		for idx, state in enumerate(self.__states):
+			self.__state_values[idx] = state.get_value()
+
+		self.__compute(True)
+
+	def update(self):
+		"""
+		Reads again the entities owning evolutions changed since the previous tick
+		and recomputes the intensities if any value changed
+		Must be called after the snapshot is taken
+		"""
+		self.__ticks += 1
+		if self.__ticks % self.__resync_ticks == 0:
+			self.resync()
+			return
+
+		# Entities owning an evolution changed since the previous tick
+		dirty = set([engine.get_owner(row) for row in snapshot.get_dirty_rows()])
+		changed = False
+
+		for entity in dirty:
+			if entity in self.__hv_index:
+				idx = self.__hv_index[entity]
+				value = entity.get_hv_value()
+				changed = changed or value != self.__hv_values[idx]
+				self.__hv_values[idx] = value
+
+			elif entity in self.__state_index:
+				idx = self.__state_index[entity]
+				value = entity.get_value()
+				changed = changed or value != self.__state_values[idx]
+				self.__state_values[idx] = value
+
+		if changed:
+			self.__compute()
+
+	def __compute(self, force=False):
+		"""
+		Computes every intensity as hv_value + ALPHA*hv_value*es_value
+		and hands the changed ones to their Motivations
+		@ force bool: hands every intensity
+		"""
+		hv_value = self.__hv_matrix.dot(self.__hv_values)
+		es_value = self.__es_matrix.dot(self.__state_values)
+		intensities = hv_value + ALPHA*hv_value*es_value
+
+		if force:
+			changed = range(len(self.__motivations))
+		else:
+			changed = np.flatnonzero(intensities != self.__intensities)
+
+		for idx in changed:
+			self.__motivations[idx].set_intensity(float(intensities[idx]))
+
+		self.__intensities = intensities
@@ -0,0 +1,700 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from threading import Lock
+from motivational_model.classes.clock import WallClock
+
+CONSTANT = 0
+LINEAR = 1
+EXPONENTIAL = 2
+LOGARITHMIC = 3
+STEP = 4
+
+INITIAL_CAPACITY = 64
+
+class EvolutionEngine():
+	"""
+	Evolution Engine Class
+	Stores every Temporal Evolution as one row of a set of arrays
+	and advances all the due rows at once
+	"""
+	def __init__(self, capacity=INITIAL_CAPACITY):
+
+		self.__size = 0 # Number of rows in use
+		self.__capacity = 0
+		self.__idle_polls = 0 # Due rows found not evolving
+		self.__wake = None # Called when a parked row becomes due
+		self.__clock = WallClock() # Time source of every evolution
+
+		# Evolution state
+		self.__value = np.zeros(0, dtype=np.float64)
+		self.__fn_time = np.zeros(0, dtype=np.float64)
+		self.__evolving = np.zeros(0, dtype=bool)
+		self.__step_done = np.zeros(0, dtype=bool) # Step applied, pending deactivation
+		self.__dirty = np.zeros(0, dtype=bool) # Value or evolving flag changed since the last snapshot
+		self.__owner = list() # Entity whose value depends on each row
+
+		# Groups of rows added up together, -1 if the row has no group
+		self.__group = np.zeros(0, dtype=np.int64)
+		self.__group_rows = list() # Group -> rows
+
+		# Lazy evaluation. Value and fn_time are the anchor of the closed form
+		self.__lazy = np.zeros(0, dtype=bool)
+		self.__anchor_time = np.zeros(0, dtype=np.float64)
+		self.__last_value = np.zeros(0, dtype=np.float64) # Lazy row value at the last snapshot
+
+		# Evolution parameters
+		self.__te_id = np.zeros(0, dtype=np.int8)
+		self.__slope = np.zeros(0, dtype=np.float64)
+		self.__tau = np.ones(0, dtype=np.float64)
+		self.__step = np.zeros(0, dtype=np.float64)
+		self.__exp_factor = np.zeros(0, dtype=np.float64) # exp(1/tau), one time step of the exponential
+		self.__curve = np.zeros(0, dtype=np.float64) # Unclamped exp(fn_time/tau), advanced by exp_factor
+		self.__upper_limit = np.zeros(0, dtype=np.float64)
+		self.__lower_limit = np.zeros(0, dtype=np.float64)
+		self.__satisfaction_time = np.zeros(0, dtype=np.float64)
+		self.__time_step = np.ones(0, dtype=np.float64)
+
+		# Scheduling
+		self.__registered = np.zeros(0, dtype=bool)
+		self.__next_due = np.zeros(0, dtype=np.float64)
+
+		self.__lock = Lock()
+
+		self.__grow(capacity)
+
+	def __grow(self, capacity):
+		"""
+		Resizes every column to the given capacity
+		@ capacity int: number of rows
+		"""
+		def resize(column, fill):
+			aux = np.full(capacity, fill, dtype=column.dtype)
+			aux[:self.__size] = column[:self.__size]
+			return aux
+
+		self.__value = resize(self.__value, 0)
+		self.__fn_time = resize(self.__fn_time, 0)
+		self.__evolving = resize(self.__evolving, False)
+		self.__step_done = resize(self.__step_done, False)
+		self.__dirty = resize(self.__dirty, False)
+		self.__group = resize(self.__group, -1)
+		self.__lazy = resize(self.__lazy, False)
+		self.__anchor_time = resize(self.__anchor_time, 0)
+		self.__last_value = resize(self.__last_value, np.nan)
+		self.__te_id = resize(self.__te_id, CONSTANT)
+		self.__slope = resize(self.__slope, 0)
+		self.__tau = resize(self.__tau, 1)
+		self.__step = resize(self.__step, 0)
+		self.__exp_factor = resize(self.__exp_factor, np.e)
+		self.__curve = resize(self.__curve, 1)
+		self.__upper_limit = resize(self.__upper_limit, 0)
+		self.__lower_limit = resize(self.__lower_limit, 0)
+		self.__satisfaction_time = resize(self.__satisfaction_time, 0)
+		self.__time_step = resize(self.__time_step, 1)
+		self.__registered = resize(self.__registered, False)
+		self.__next_due = resize(self.__next_due, np.inf)
+
+		self.__capacity = capacity
+
+	def add(self, initial_value, upper_limit, lower_limit, satisfaction_time, params_std, evolving, time_step, lazy=False):
+		"""
+		Adds a new evolution row
+		@ lazy bool: the value is computed on demand instead of stepped
+		@ returns int: row index
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		if self.__size == self.__capacity:
+			self.__grow(2*self.__capacity)
+
+		row = self.__size
+		self.__size += 1
+
+		self.__value[row] = initial_value
+		self.__fn_time[row] = initial_value
+		self.__evolving[row] = evolving
+		self.__dirty[row] = True
+		self.__owner.append(None)
+		self.__upper_limit[row] = upper_limit
+		self.__lower_limit[row] = lower_limit
+		self.__satisfaction_time[row] = satisfaction_time
+		self.__time_step[row] = time_step
+		self.__lazy[row] = lazy
+		self.__anchor_time[row] = self.__clock.now()
+		self.__set_params(row, params_std)
+		# Releases the resource
+		self.__lock.release()
+
+		return row
+
+	def __set_params(self, row, params_std):
+		"""
+		Copies evolution parameters into the row. Missing parameters are kept
+		"""
+		self.__te_id[row] = params_std["te_id"]
+		if params_std.get("slope") is not None:
+			self.__slope[row] = params_std["slope"]
+		if params_std.get("tau") is not None:
+			self.__tau[row] = params_std["tau"]
+		if params_std.get("step") is not None:
+			self.__step[row] = params_std["step"]
+		self.__reset_curve(row)
+
+	def __reset_curve(self, rows):
+		"""
+		Recomputes the exponential coefficients of rows whose fn_time or tau changed
+		@ rows int or array: row indexes
+		"""
+		with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+			self.__exp_factor[rows] = np.exp(1.0/self.__tau[rows])
+			self.__curve[rows] = np.exp(self.__fn_time[rows]/self.__tau[rows])
+
+	def set_params(self, row, params_std):
+		"""
+		Sets the evolution parameters of a row
+		@ params_std dict: te_id, slope, tau and step
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		self.__anchor(row, self.__clock.now())
+		self.__set_params(row, params_std)
+		self.__dirty[row] = True
+		# Releases the resource
+		self.__lock.release()
+
+	def get_value(self, row):
+		"""
+		Returns row current value
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		if self.__lazy[row]:
+			value = self.__evaluate(row, self.__clock.now())
+		else:
+			value = float(self.__value[row])
+		# Releases the resource
+		self.__lock.release()
+
+		return value
+
+	def set_value(self, row, value):
+		"""
+		Sets row current value
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		self.__value[row] = value
+		self.__dirty[row] = True
+		if self.__lazy[row]:
+			self.__reanchor(row, value, self.__clock.now())
+		# Releases the resource
+		self.__lock.release()
+
+	def get_fn_time(self, row):
+		"""
+		Returns row time value for the exponential and logarithmic functions
+		"""
+		if self.__lazy[row] and self.__evolving[row] and self.__registered[row]:
+			return float(self.__fn_time[row]) + self.__elapsed(row, self.__clock.now())
+
+		return float(self.__fn_time[row])
+
+	def set_fn_time(self, row, fn_time):
+		"""
+		Sets row time value for the exponential and logarithmic functions
+		"""
+		self.__fn_time[row] = fn_time
+		self.__reset_curve(row)
+		self.__anchor_time[row] = self.__clock.now()
+
+	def is_evolving(self, row):
+		"""
+		Returns True if the row is evolving
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		if self.__lazy[row]:
+			self.__expire(row, self.__clock.now())
+		evolving = bool(self.__evolving[row])
+		# Releases the resource
+		self.__lock.release()
+
+		return evolving
+
+	def set_evolving(self, row, evolving):
+		"""
+		Sets row evolving value
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		if self.__lazy[row]:
+			now = self.__clock.now()
+			self.__expire(row, now)
+			if bool(evolving) != bool(self.__evolving[row]):
+				# A pending step is applied before stopping
+				if self.__te_id[row] == STEP and self.__registered[row] and not evolving:
+					value = self.__value[row] + self.__step[row]
+					self.__value[row] = min(max(value, self.__lower_limit[row]), self.__upper_limit[row])
+				# Freezes or resumes the closed form at the current value
+				self.__anchor(row, now)
+		if bool(evolving) != bool(self.__evolving[row]):
+			self.__dirty[row] = True
+		self.__evolving[row] = evolving
+
+		# Parked rows are due again when they start evolving
+		wake = evolving and self.__registered[row] and not self.__lazy[row] and self.__next_due[row] == np.inf
+		if wake:
+			self.__next_due[row] = self.__clock.now()
+		# Releases the resource
+		self.__lock.release()
+
+		if wake and self.__wake is not None:
+			self.__wake()
+
+	def set_clock(self, clock):
+		"""
+		Sets the time source of every evolution
+		@ clock WallClock or SimulatedClock: clock object
+		"""
+		self.__clock = clock
+
+	def get_clock(self):
+		"""
+		Returns the time source of every evolution
+		"""
+		return self.__clock
+
+	def set_wake_callback(self, callback):
+		"""
+		Sets the function called when a parked row becomes due
+		@ callback function: callable without arguments
+		"""
+		self.__wake = callback
+
+	def get_idle_polls(self):
+		"""
+		Returns the number of due rows found not evolving
+		"""
+		return self.__idle_polls
+
+	def get_te_id(self, row):
+		"""
+		Returns row evolution type
+		"""
+		return int(self.__te_id[row])
+
+	def register(self, row, now):
+		"""
+		Starts advancing a row. Its first step is due now
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		self.__fn_time[row] = self.__value[row]
+		self.__reset_curve(row)
+		self.__step_done[row] = False
+		self.__registered[row] = True
+		self.__dirty[row] = True
+		self.__anchor_time[row] = now
+
+		# Lazy rows are never stepped
+		if not self.__lazy[row]:
+			self.__next_due[row] = now
+		# Releases the resource
+		self.__lock.release()
+
+	def unregister(self, row):
+		"""
+		Stops advancing a row. Waits until the current tick finishes
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		self.__anchor(row, self.__clock.now())
+		self.__registered[row] = False
+		self.__dirty[row] = True
+		self.__next_due[row] = np.inf
+		# Releases the resource
+		self.__lock.release()
+
+	def is_registered(self, row):
+		"""
+		Returns True if the row is being advanced
+		"""
+		return bool(self.__registered[row])
+
+	def add_group(self):
+		"""
+		Adds a new group of rows
+		@ returns int: group index
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		group = len(self.__group_rows)
+		self.__group_rows.append(list())
+		# Releases the resource
+		self.__lock.release()
+
+		return group
+
+	def set_group(self, row, group):
+		"""
+		Moves a row into a group
+		@ group int: group index, -1 removes the row from its group
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		if self.__group[row] >= 0:
+			self.__group_rows[self.__group[row]].remove(row)
+		self.__group[row] = group
+		if group >= 0:
+			self.__group_rows[group].append(row)
+		# Releases the resource
+		self.__lock.release()
+
+	def get_group(self, group):
+		"""
+		Returns the sum of the evolving rows of a group at the current time
+		@ returns tuple: sum of the values and number of evolving rows
+		"""
+		total = 0.0
+		count = 0
+
+		for row in list(self.__group_rows[group]):
+			if self.is_evolving(row):
+				total += self.get_value(row)
+				count += 1
+
+		return total, count
+
+	def set_group_value(self, group, value):
+		"""
+		Sets the value of every row of a group in one locked pass
+		@ value float: new value
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		rows = np.array(self.__group_rows[group], dtype=np.int64)
+		lazy = rows[self.__lazy[rows]]
+		rows = rows[~self.__lazy[rows] & (self.__value[rows] != value)]
+		self.__value[rows] = value
+		self.__dirty[rows] = True
+
+		if lazy.size:
+			now = self.__clock.now()
+			for row in lazy:
+				self.__value[row] = value
+				self.__dirty[row] = True
+				self.__reanchor(row, value, now)
+		# Releases the resource
+		self.__lock.release()
+
+	def snapshot(self):
+		"""
+		Reads every row at once. Lazy rows are evaluated at the current time
+		Dirty flags are cleared
+		Evolving rows of every group are added up
+		@ returns tuple: value array copy, evolving array copy, dirty row indexes,
+		group sum array and group evolving row count array
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		n = self.__size
+		now = self.__clock.now()
+
+		value = self.__value[:n].copy()
+		lazy = np.flatnonzero(self.__lazy[:n])
+		value[lazy] = self.__evaluate_rows(lazy, now)
+		evolving = self.__evolving[:n].copy()
+
+		# Lazy rows are dirty when their value changed since the last snapshot
+		self.__dirty[lazy[value[lazy] != self.__last_value[lazy]]] = True
+		self.__last_value[lazy] = value[lazy]
+
+		dirty = np.flatnonzero(self.__dirty[:n])
+		self.__dirty[:n] = False
+
+		groups = self.__group[:n]
+		mask = evolving & (groups >= 0)
+		group_sum = np.bincount(groups[mask], weights=value[mask], minlength=len(self.__group_rows))
+		group_count = np.bincount(groups[mask], minlength=len(self.__group_rows))
+		# Releases the resource
+		self.__lock.release()
+
+		return value, evolving, dirty, group_sum, group_count
+
+	def save_rows(self, rows):
+		"""
+		Reads the state of a set of rows at once. Lazy rows are anchored at the current time
+		@ rows array: row indexes
+		@ returns tuple: value, fn_time and evolving array copies
+		"""
+		rows = np.asarray(rows, dtype=np.int64)
+
+		# Locks the resource
+		self.__lock.acquire()
+		now = self.__clock.now()
+		for row in rows[self.__lazy[rows]]:
+			self.__expire(row, now)
+			self.__anchor(row, now)
+
+		value = self.__value[rows].copy()
+		fn_time = self.__fn_time[rows].copy()
+		evolving = self.__evolving[rows].copy()
+		# Releases the resource
+		self.__lock.release()
+
+		return value, fn_time, evolving
+
+	def restore_rows(self, rows, value, fn_time, evolving):
+		"""
+		Sets the state of a set of rows at once. Evolving rows continue from the current time
+		@ rows array: row indexes
+		@ value array: row values
+		@ fn_time array: row time values for the exponential and logarithmic functions
+		@ evolving array: row evolving flags
+		"""
+		rows = np.asarray(rows, dtype=np.int64)
+
+		# Locks the resource
+		self.__lock.acquire()
+		now = self.__clock.now()
+		self.__value[rows] = value
+		self.__fn_time[rows] = fn_time
+		self.__reset_curve(rows)
+		self.__evolving[rows] = evolving
+		self.__step_done[rows] = False
+		self.__anchor_time[rows] = now
+		self.__dirty[rows] = True
+
+		# Parked rows are due again if they are restored evolving
+		woken = rows[self.__evolving[rows] & self.__registered[rows] & ~self.__lazy[rows] & (self.__next_due[rows] == np.inf)]
+		self.__next_due[woken] = now
+		# Releases the resource
+		self.__lock.release()
+
+		if woken.size and self.__wake is not None:
+			self.__wake()
+
+	def copy_row(self, row, source):
+		"""
+		Continues a row from the current point of another one. Its parameters and limits are kept
+		@ row int: row index
+		@ source int: row whose value, fn_time, evolving flag and next step are copied
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		now = self.__clock.now()
+		if self.__lazy[source]:
+			self.__expire(source, now)
+			self.__anchor(source, now)
+
+		self.__value[row] = self.__value[source]
+		self.__fn_time[row] = self.__fn_time[source]
+		self.__reset_curve(row)
+		self.__evolving[row] = self.__evolving[source]
+		self.__step_done[row] = self.__step_done[source]
+		self.__anchor_time[row] = self.__anchor_time[source]
+		self.__dirty[row] = True
+
+		# The next step keeps its due time
+		if self.__registered[row] and not self.__lazy[row] and not self.__lazy[source]:
+			self.__next_due[row] = self.__next_due[source]
+		# Releases the resource
+		self.__lock.release()
+
+	def set_owner(self, row, owner):
+		"""
+		Sets the entity whose value depends on the row
+		@ owner object: Homeostatic Variable or State object
+		"""
+		self.__owner[row] = owner
+
+	def get_owner(self, row):
+		"""
+		Returns the entity whose value depends on the row
+		"""
+		return self.__owner[row]
+
+	def is_lazy(self, row):
+		"""
+		Returns True if the row value is computed on demand
+		"""
+		return bool(self.__lazy[row])
+
+	def __elapsed(self, row, now):
+		"""
+		Returns the number of time steps since the row anchor
+		"""
+		return max(now - self.__anchor_time[row], 0)/self.__time_step[row]
+
+	def __evaluate(self, row, now):
+		"""
+		Computes the clamped value of a lazy row at the given time
+		"""
+		return float(self.__evaluate_rows(np.array([row], dtype=np.int64), now)[0])
+
+	def __evaluate_rows(self, rows, now):
+		"""
+		Computes the clamped value of lazy rows at the given time
+		Saturation keeps monotonic functions on the limit, so the
+		satisfaction time hold does not change the closed form
+		@ rows array: lazy row indexes
+		@ returns array: values
+		"""
+		self.__expire_rows(rows, now)
+		value = self.__value[rows].copy()
+
+		active = self.__evolving[rows] & self.__registered[rows]
+		te_id = np.where(active, self.__te_id[rows], CONSTANT)
+		n = np.maximum(now - self.__anchor_time[rows], 0)/self.__time_step[rows]
+		fn_time = self.__fn_time[rows] + n
+
+		with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+			mask = te_id == LINEAR
+			value[mask] += self.__slope[rows[mask]]*n[mask]
+
+			mask = te_id == EXPONENTIAL
+			value[mask] = np.exp(fn_time[mask]/self.__tau[rows[mask]])
+
+			mask = te_id == LOGARITHMIC
+			value[mask] = np.where(fn_time[mask] > 0, np.log(fn_time[mask]), -np.inf)
+
+		mask = te_id == STEP
+		value[mask] += self.__step[rows[mask]]
+
+		return np.minimum(np.maximum(value, self.__lower_limit[rows]), self.__upper_limit[rows])
+
+	def __expire(self, row, now):
+		"""
+		Stops a lazy step row one time step after it was applied
+		"""
+		self.__expire_rows(np.array([row], dtype=np.int64), now)
+
+	def __expire_rows(self, rows, now):
+		"""
+		Stops the lazy step rows applied at least one time step ago
+		@ rows array: lazy row indexes
+		"""
+		rows = rows[(self.__te_id[rows] == STEP) & self.__evolving[rows] & self.__registered[rows]]
+		rows = rows[np.maximum(now - self.__anchor_time[rows], 0)/self.__time_step[rows] >= 1]
+		value = self.__value[rows] + self.__step[rows]
+		self.__value[rows] = np.minimum(np.maximum(value, self.__lower_limit[rows]), self.__upper_limit[rows])
+		self.__evolving[rows] = False
+		self.__anchor_time[rows] = now
+
+	def __anchor(self, row, now):
+		"""
+		Moves the anchor of a lazy row to the given time keeping its value
+		"""
+		if self.__lazy[row] and self.__evolving[row] and self.__registered[row] and self.__te_id[row] != STEP:
+			n = self.__elapsed(row, now)
+			self.__value[row] = self.__evaluate(row, now)
+			self.__fn_time[row] += n
+		self.__anchor_time[row] = now
+
+	def __reanchor(self, row, value, now):
+		"""
+		Restarts the closed form of a lazy row from the given value
+		"""
+		te_id = self.__te_id[row]
+
+		# Exponential and logarithmic curves continue from the point with that value
+		with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+			if te_id == EXPONENTIAL and value > 0:
+				self.__fn_time[row] = self.__tau[row]*np.log(value)
+			elif te_id == LOGARITHMIC:
+				self.__fn_time[row] = np.exp(value)
+
+		self.__anchor_time[row] = now
+
+	def get_next_due(self):
+		"""
+		Returns the time at which the next row is due
+		"""
+		if self.__size == 0:
+			return np.inf
+
+		return float(self.__next_due[:self.__size].min())
+
+	def tick(self, now):
+		"""
+		Advances every due row one step
+		@ now float: current time
+		@ returns int: number of rows advanced
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		n = self.__size
+		due = self.__next_due[:n] <= now
+		evolving = self.__evolving[:n]
+
+		# Rows waiting for activation are parked until set_evolving wakes them
+		idle = np.flatnonzero(due & ~evolving)
+		self.__step_done[idle] = False
+		self.__next_due[idle] = np.inf
+		self.__idle_polls += idle.size
+
+		rows = np.flatnonzero(due & evolving)
+		if rows.size:
+			self.__advance(rows, now)
+		# Releases the resource
+		self.__lock.release()
+
+		return rows.size
+
+	def __advance(self, rows, now):
+		"""
+		Computes the new value of the evolving rows
+		@ rows array: indexes of due evolving rows
+		"""
+		te_id = self.__te_id[rows]
+		new_value = self.__value[rows].copy()
+		delay = self.__time_step[rows].copy()
+
+		# Linear evolution
+		mask = te_id == LINEAR
+		new_value[mask] += self.__slope[rows[mask]]
+
+		# Exponential and logarithmic evolutions
+		mask = (te_id == EXPONENTIAL) | (te_id == LOGARITHMIC)
+		self.__fn_time[rows[mask]] += 1
+
+		with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+			# exp((fn_time+1)/tau) = exp(fn_time/tau)*exp(1/tau)
+			mask = te_id == EXPONENTIAL
+			exp_rows = rows[mask]
+			self.__curve[exp_rows] *= self.__exp_factor[exp_rows]
+			new_value[mask] = self.__curve[exp_rows]
+
+			mask = te_id == LOGARITHMIC
+			new_value[mask] = np.log(self.__fn_time[rows[mask]])
+
+		# Step evolution is applied once and stops after one time step
+		step = te_id == STEP
+		finished = step & self.__step_done[rows]
+		applied = step & ~finished
+		new_value[applied] += self.__step[rows[applied]]
+		self.__step_done[rows[applied]] = True
+
+		# Saturation holds the value during the satisfaction time
+		upper = self.__upper_limit[rows]
+		lower = self.__lower_limit[rows]
+		over = new_value > upper
+		new_value = np.where(over, upper, np.where(new_value < lower, lower, new_value))
+		delay += np.where(over & (te_id != CONSTANT), self.__satisfaction_time[rows], 0)
+
+		# Finished steps keep their value and stop evolving
+		done = rows[finished]
+		self.__evolving[done] = False
+		self.__step_done[done] = False
+		self.__dirty[done] = True
+		delay[finished] = np.inf
+
+		changed = rows[~finished]
+		self.__dirty[changed[self.__value[changed] != new_value[~finished]]] = True
+		self.__value[changed] = new_value[~finished]
+		# Next step is anchored to the due time to avoid drift
+		self.__next_due[rows] = np.maximum(self.__next_due[rows] + delay, now)
+
+engine = EvolutionEngine() # Shared by every Temporal Evolution
@@ -1,15 +1,20 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from collections import OrderedDict
 from motivational_model.classes.temporalevolution import TemporalEvolution
+from motivational_model.classes.engine import engine
 from motivational_model.classes.effect import Effect
+from motivational_model.classes.snapshot import snapshot
 from motivational_model.logger.log import Logger
 
+EFFECT_IDLE_TIME = 600.0 # Seconds an effect evolution is kept switched off before its slot is released
+
 class HomeostaticVariable(TemporalEvolution, Logger):
 	"""
 	Homeostatic Variable Class
 	"""
-	def __init__(self, id, name, initial_value, ideal_value, upper_limit, lower_limit, satisfaction_time, params_std, time_step=1.0, logging=False):
+	def __init__(self, id, name, initial_value, ideal_value, upper_limit, lower_limit, satisfaction_time, params_std, time_step=1.0, logging=False, lazy=False):
 		
 		self.__id = id
 		self.__name = name
@@ -23,14 +28,21 @@ class HomeostaticVariable(TemporalEvolution, Logger):
 		self.__params_std = params_std
 
 		self.__time_step = time_step
+		self.__lazy = lazy # Evolutions computed on demand
 
-		self.__eff_evols = list() # Stores Effect Temporal Evolution objects
+		self.__eff_evols = dict() # Effect id -> Effect Temporal Evolution object
+		self.__active_effects = set() # Ids of the effects switched on
+		self.__idle_effects = OrderedDict() # Effect id -> time it was switched off, oldest first
+		self.__pool = list() # Released Effect Temporal Evolution objects ready to be reused
+		self.__eff_group = engine.add_group() # Engine group adding up the Effect evolutions
 
 		self.__value = 0 # Initializes Homeostatic Variable Value
+		self.__tick = None # Snapshot tick of the value
 
 		# Creates Homeostatic Variable Temporal Evolution object
-		self.__hv_evol = TemporalEvolution(id, name, initial_value, ideal_value, upper_limit, lower_limit, satisfaction_time, params_std, True, time_step)
-		self.__hv_evol.start() # Starts the thread
+		self.__hv_evol = TemporalEvolution(id, name, initial_value, ideal_value, upper_limit, lower_limit, satisfaction_time, params_std, True, time_step, lazy)
+		self.__hv_evol.set_owner(self) # Changes mark the Homeostatic Variable dirty
+		self.__hv_evol.start() # Registers the evolution in the scheduler
 
 		# Logger
 		self.__logging = logging
@@ -90,11 +102,32 @@ class HomeostaticVariable(TemporalEvolution, Logger):
 		"""
 		return self.__params_std
 
+	def set_params_std(self, params_std):
+		"""
+		Sets new Standard Evolution Parameters keeping the current value
+		@ params_std dict: te_id, slope, tau and step
+		"""
+		self.__params_std = params_std
+		self.__hv_evol.set_params(params_std)
+
 	def get_eff_evols(self):
 		"""
 		Returns Related Action Effect Temporal Evolution objects list
 		"""
-		return self.__eff_evols
+		return list(self.__eff_evols.values())
+
+	def get_active_eff_evols(self):
+		"""
+		Returns the Effect Temporal Evolution objects switched on
+		"""
+		return [self.__eff_evols[eff_id] for eff_id in self.__active_effects]
+
+	def get_eff_evol(self, eff_id):
+		"""
+		Returns the Temporal Evolution of an Effect. None if there is none
+		@ eff_id int: Action Effect id
+		"""
+		return self.__eff_evols.get(eff_id)
 
 	def stop(self):
 		"""
@@ -114,51 +147,88 @@ class HomeostaticVariable(TemporalEvolution, Logger):
 		Adds Related Action Effect Temporal Evolution objects to list
 		@ var Effect: Effect object
 		"""
-		if bool(self.__eff_evols):
-			for evol in self.__eff_evols:
-				if var.get_id() == evol.get_id(): # Avoids repetition
-					evol.set_evolving_value(True)
-					evol.set_value(self.__hv_evol.get_value())
+		eff_id = var.get_id()
+
+		if eff_id in self.__eff_evols: # Avoids repetition
+			evol = self.__eff_evols[eff_id]
+			self.__idle_effects.pop(eff_id, None)
+			evol.set_params(var.get_params_std())
+			evol.set_evolving_value(True)
+			evol.set_value(self.__hv_evol.get_value())
+
+		elif bool(self.__pool):
+			# Reuses a released slot
+			evol = self.__pool.pop()
+			evol.reuse(eff_id, "effect"+str(eff_id), self.__hv_evol.get_value(), var.get_params_std())
+			self.__eff_evols[eff_id] = evol
 
-		# Creates effect and starts if it is not in list
-		if not bool(self.__eff_evols) or not var.get_id() in [e.get_id() for e in self.__eff_evols]:
-			self.__eff_evols.append(TemporalEvolution(var.get_id(), "effect"+str(var.get_id()), self.__hv_evol.get_value(), self.__ideal_value, self.__upper_limit, self.__lower_limit, self.__satisfaction_time, var.get_params_std(), True, self.__time_step))
-			self.__eff_evols[-1].start() # Starts the thread
+		else:
+			# Creates effect and starts it
+			evol = TemporalEvolution(eff_id, "effect"+str(eff_id), self.__hv_evol.get_value(), self.__ideal_value, self.__upper_limit, self.__lower_limit, self.__satisfaction_time, var.get_params_std(), True, self.__time_step, self.__lazy)
+			evol.set_owner(self) # Changes mark the Homeostatic Variable dirty
+			evol.set_group(self.__eff_group) # Added up with the other Effects
+			evol.start() # Registers the evolution in the scheduler
+			self.__eff_evols[eff_id] = evol
 
-		# Checks if any effect is running
-		if any([e.is_evolving() for e in self.__eff_evols]):
-			# Stops current evolution of the hv
-			self.__hv_evol.set_evolving_value(False)
+		self.__active_effects.add(eff_id)
+
+		# Stops current evolution of the hv
+		self.__hv_evol.set_evolving_value(False)
+
+		self.__compact()
 
 	def remove_effect(self, eff_id):
 		"""
 		Removes Action Effects already taken into account
 		@ eff_ids int: Action Effect id
 		"""
-		if bool(self.__eff_evols):
-			for idx, evol in enumerate(self.__eff_evols):
-				if evol.get_id() == eff_id:	
-					evol.set_evolving_value(False)
+		if not eff_id in self.__active_effects:
+			return
+
+		evol = self.__eff_evols[eff_id]
+		evol.set_evolving_value(False)
+		self.__active_effects.remove(eff_id)
+		self.__idle_effects[eff_id] = engine.get_clock().now()
 
-		# Checks if any effect is running
-		if not any([e.is_evolving() for e in self.__eff_evols]):
+		# Checks if any effect is running. Step effects stop evolving by themselves while still switched on
+		if not any([self.__eff_evols[id].is_evolving() for id in self.__active_effects]):
 			# Gets effect value to be set in hv evolving value
-			value = evol.get_value()
-			self.__hv_evol.set_value(value)
+			self.__hv_evol.set_value(evol.get_value())
 			self.__hv_evol.set_evolving_value(True)
 
+		self.__compact()
+
+	def __compact(self):
+		"""
+		Releases the slots of the effects switched off for longer than EFFECT_IDLE_TIME
+		"""
+		now = engine.get_clock().now()
+
+		while bool(self.__idle_effects):
+			eff_id = next(iter(self.__idle_effects))
+			if now - self.__idle_effects[eff_id] < EFFECT_IDLE_TIME:
+				break
+
+			del self.__idle_effects[eff_id]
+			evol = self.__eff_evols.pop(eff_id)
+			evol.stop() # Unregisters the evolution from the scheduler
+			self.__pool.append(evol)
+
 	def get_hv_value(self):
 		"""
 		Returns Homeostatic Variable Deficit value
+		Computed once per snapshot tick against the frozen evolution values
 		"""
-		aux_value = 0
+		tick = snapshot.get_tick()
+		if tick is not None and tick == self.__tick:
+			return self.__value
+
 		value = None
 
-		if bool(self.__eff_evols) and any([e.is_evolving() for e in self.__eff_evols]):
+		# Sum of the evolving Effects, added up by the engine when the snapshot is taken
+		aux_value, evolving = snapshot.get_group(self.__eff_group)
 
-			for evol in self.__eff_evols:
-				if evol.is_evolving():
-					aux_value += evol.get_value()
+		if bool(evolving):
 
 			value = aux_value
 
@@ -168,16 +238,18 @@ class HomeostaticVariable(TemporalEvolution, Logger):
 			elif value < self.__lower_limit:
 				value = self.__lower_limit
 
-			for evol in self.__eff_evols:
-				evol.set_value(value) # Sets new initial value for multiple Effects
+			engine.set_group_value(self.__eff_group, value) # Sets new initial value for multiple Effects
 			
 			value = self.__ideal_value - value
 		
 		if value is None:
-			value = self.__hv_evol.get_deficit()
+			value = self.__ideal_value - snapshot.get_value(self.__hv_evol)
 
 		if self.__logging and self.__value != value:
 
 			Logger.write_file(self, self.__name, value) # Writes Homeostatic Variable name and value
 
+		self.__value = value
+		self.__tick = tick
+
 		return value
\ No newline at end of file
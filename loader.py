@@ -1,19 +1,38 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
 import sqlite3
-from sqlite3 import Error
-import pandas as pd
+import hashlib
 import rospkg
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+from sqlite3 import Error
+from motivational_model.db_loader.resolver import Resolver
 
 pkg_name = "motivational_model"
 rospack = rospkg.RosPack()
 
+# Tables used to build the object graph
+TABLES = ["Temporal_Evolutions", "Standard_Evolution", "Endogenous_Exogenous", "Constancy", "Homeostatic_Variables",
+          "Motivations", "Stimuli", "Actions", "Agents", "State", "Actions_Effect"]
+CACHE_VERSION = 1 # Changed whenever the resolved configuration layout changes
+
+def dict_factory(cursor, row):
+    """
+    Row factory returning every row as a column name -> value dict
+    """
+    return dict((description[0], row[idx]) for idx, description in enumerate(cursor.description))
+
 class DbLoader():
 	
     def __init__(self):
         
         self.__database = rospack.get_path(pkg_name) + "/data/db/MM_db.db"
+        self.__cache = rospack.get_path(pkg_name) + "/data/db/MM_db.cache" # Compiled configuration
+        self.__mtime = None # Database mtime of the last loaded configuration
      
         # Creates database connection
         self.__conn = self.create_connection(self.__database)
@@ -51,4 +70,103 @@ class DbLoader():
                 var[names[idx]] = value
             variables.append(var)
 
-        return variables
\ No newline at end of file
+        return variables
+
+    def load_tables(self, tables=TABLES):
+        """
+        Reads every table in a single read transaction
+        @ tables list: table names
+        @ returns dict: table name -> list of row dicts
+        """
+        data = dict()
+
+        cur = self.__conn.cursor()
+        cur.row_factory = dict_factory
+        cur.execute("BEGIN")
+
+        try:
+            for string in tables:
+                cur.execute("SELECT * FROM " + string)
+                data[string] = cur.fetchall()
+        finally:
+            self.__conn.commit()
+
+        return data
+
+    def load_config(self, use_cache=True):
+        """
+        Returns the resolved configuration, read from the compiled cache
+        when the database has not changed since it was written
+        @ use_cache bool: reads and writes the compiled cache
+        @ returns dict: configuration resolved by the Resolver
+        """
+        mtime = os.path.getmtime(self.__database)
+        self.__mtime = mtime
+
+        if not use_cache:
+            return Resolver(self.load_tables()).resolve()
+
+        cache = self.__read_cache()
+
+        if cache is not None and cache["mtime"] == mtime:
+            return cache["config"]
+
+        # Same content with a new mtime keeps the cache
+        digest = self.__get_digest()
+
+        if cache is not None and cache["digest"] == digest:
+            config = cache["config"]
+        else:
+            config = Resolver(self.load_tables()).resolve()
+
+        self.__write_cache({"version": CACHE_VERSION, "mtime": mtime, "digest": digest, "config": config})
+
+        return config
+
+    def has_changed(self):
+        """
+        Returns True if the database was modified after the last loaded configuration
+        """
+        try:
+            return os.path.getmtime(self.__database) != self.__mtime
+        except OSError:
+            return False
+
+    def __get_digest(self):
+        """
+        Returns the SHA-1 digest of the database file
+        """
+        sha = hashlib.sha1()
+
+        with open(self.__database, "rb") as db_file:
+            for chunk in iter(lambda: db_file.read(1 << 20), b""):
+                sha.update(chunk)
+
+        return sha.hexdigest()
+
+    def __read_cache(self):
+        """
+        Returns the compiled cache. None if it is missing, unreadable or outdated
+        """
+        try:
+            with open(self.__cache, "rb") as cache_file:
+                cache = pickle.load(cache_file)
+        except Exception:
+            return None
+
+        if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+            return None
+
+        return cache
+
+    def __write_cache(self, cache):
+        """
+        Writes the compiled cache atomically
+        @ cache dict: version, database mtime and digest, and resolved configuration
+        """
+        try:
+            with open(self.__cache + ".tmp", "wb") as cache_file:
+                pickle.dump(cache, cache_file, pickle.HIGHEST_PROTOCOL)
+            os.rename(self.__cache + ".tmp", self.__cache)
+        except (IOError, OSError) as e:
+            print(e)
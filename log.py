@@ -6,35 +6,331 @@ import rospkg
 
 from random import randint
 from datetime import datetime
+from threading import Thread, Lock
+from time import time
+try:
+	from Queue import Queue, Full, Empty
+except ImportError:
+	from queue import Queue, Full, Empty
+from motivational_model.logger.binlog import BinarySink
+from motivational_model.logger.telemetry import TelemetryDatabase, TelemetrySink
 
 pkg_name = 'motivational_model'
 rospack = rospkg.RosPack()
 
+QUEUE_SIZE = 10000 # Lines waiting to be written
+BATCH_SIZE = 500 # Buffered lines that trigger a flush
+FLUSH_INTERVAL = 1.0 # Seconds between flushes
+
+class TextSink():
+	"""
+	Text Sink Class
+	Writes one semicolon separated text file per variable
+	"""
+	def __init__(self, path):
+
+		self.__path = path
+		self.__files = dict() # Variable name -> open file
+
+	def write(self, records):
+		"""
+		Appends records to the variable files
+		@ records list: (key, timestamp, value) tuples
+		"""
+		lines = dict()
+		for key, stamp, value in records:
+			lines.setdefault(key, list()).append(str(datetime.fromtimestamp(stamp))+";"+str(value)+'\n')
+
+		for key, aux_lines in lines.items():
+			if not key in self.__files:
+				# Opens the file in append mode in the specified path
+				self.__files[key] = open(self.__path+"/"+str(key)+".txt", "a")
+
+			self.__files[key].write("".join(aux_lines))
+
+	def flush(self):
+		"""
+		Flushes the open files
+		"""
+		for text_file in self.__files.values():
+			text_file.flush()
+
+	def close(self):
+		"""
+		Closes the open files
+		"""
+		for text_file in self.__files.values():
+			text_file.close()
+		self.__files = dict()
+
+class LogWriter():
+	"""
+	Log Writer Class
+	Writes log records from a background thread into their sinks
+	keeping files open and flushing them in batches
+	"""
+	def __init__(self, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, block=False, log_format="text"):
+		"""
+		@ queue_size int: maximum number of lines waiting to be written
+		@ batch_size int: buffered lines that trigger a flush
+		@ flush_interval float: maximum seconds a line stays buffered
+		@ block bool: writers wait when the queue is full instead of dropping the line
+		@ log_format str: "text" for one text file per variable, "binary" for one record file per folder
+		"""
+		self.__queue = Queue(queue_size)
+		self.__batch_size = batch_size
+		self.__flush_interval = flush_interval
+		self.__block = block
+		self.__format = log_format
+
+		self.__sinks = set() # Sinks with written records
+		self.__buffers = dict() # Sink -> records waiting for the next flush
+		self.__buffered = 0
+		self.__dropped = 0 # Lines dropped because the queue was full
+
+		self.__thread = None
+		self.__lock = Lock()
+
+	def set_format(self, log_format):
+		"""
+		Sets the format of the sinks created afterwards
+		@ log_format str: "text" or "binary"
+		"""
+		self.__format = log_format
+
+	def create_sink(self, path):
+		"""
+		Creates a sink writing into the given folder
+		@ path str: folder path
+		"""
+		if self.__format == "binary":
+			return BinarySink(path)
+
+		return TextSink(path)
+
+	def write(self, sink, key, value):
+		"""
+		Queues a value to be written with the current time
+		@ sink TextSink or BinarySink: destination of the record
+		@ key str: variable name
+		@ value float: variable value
+		"""
+		if self.__thread is None:
+			self.__start()
+
+		try:
+			self.__queue.put((sink, key, time(), value), self.__block)
+		except Full:
+			self.__dropped += 1
+
+	def get_dropped(self):
+		"""
+		Returns the number of lines dropped because the queue was full
+		"""
+		return self.__dropped
+
+	def stop(self):
+		"""
+		Writes every queued record and closes the sinks
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		thread = self.__thread
+		self.__thread = None
+		# Releases the resource
+		self.__lock.release()
+
+		if thread is not None:
+			self.__queue.put(None) # Stops the thread once the queue is drained
+			thread.join()
+
+	def __start(self):
+		"""
+		Starts the writer thread
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		if self.__thread is None:
+			self.__thread = Thread(target=self.__run)
+			self.__thread.daemon = True
+			self.__thread.start()
+		# Releases the resource
+		self.__lock.release()
+
+	def __run(self):
+		"""
+		Writer loop. Buffers queued records and flushes them on size or time thresholds
+		"""
+		last_flush = time()
+
+		while True:
+			try:
+				item = self.__queue.get(True, self.__flush_interval)
+			except Empty:
+				item = False
+
+			if item is None:
+				break
+
+			if item:
+				sink, key, stamp, value = item
+				self.__buffers.setdefault(sink, list()).append((key, stamp, value))
+				self.__buffered += 1
+
+			if self.__buffered >= self.__batch_size or time() - last_flush >= self.__flush_interval:
+				self.__flush()
+				last_flush = time()
+
+		self.__flush()
+		for sink in self.__sinks:
+			sink.close()
+		self.__sinks = set()
+
+	def __flush(self):
+		"""
+		Writes every buffered record into its sink
+		"""
+		for sink, records in self.__buffers.items():
+			sink.write(records)
+			sink.flush()
+			self.__sinks.add(sink)
+
+		self.__buffers = dict()
+		self.__buffered = 0
+
+writer = LogWriter() # Shared by every Logger
+
+class Channel():
+	"""
+	Channel Class
+	Variable written by one entity into a shared sink
+	"""
+	def __init__(self, sink, key, telemetry=None):
+
+		self.__sink = sink
+		self.__key = key
+		self.__telemetry = telemetry # Telemetry sink, None if disabled
+
+	def write(self, value):
+		"""
+		Queues a value of the variable
+		@ value float: variable value
+		"""
+		writer.write(self.__sink, self.__key, value)
+
+		if self.__telemetry is not None:
+			writer.write(self.__telemetry, self.__key, value)
+
+class SinkRegistry():
+	"""
+	Sink Registry Class
+	Resolves the package path once and creates one folder and sink per log folder and run
+	"""
+	def __init__(self):
+
+		self.__data_path = None # Package data folder
+		self.__run = None # Run timestamp naming every log folder
+		self.__sinks = dict() # (folder, subfolder) -> sink
+
+		self.__telemetry = False # Values are also written into the telemetry database
+		self.__database = None
+		self.__telemetry_sinks = dict() # Kind -> TelemetrySink
+
+		self.__lock = Lock()
+
+	def __resolve(self):
+		"""
+		Resolves the package data folder and the run timestamp once
+		"""
+		if self.__data_path is None:
+			self.__data_path = rospack.get_path(pkg_name) + '/data/'
+			self.__run = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+	def get_sink(self, folder, subfolder=None):
+		"""
+		Returns the sink of a log folder, creating it the first time
+		@ folder str: log folder
+		@ subfolder str: log subfolder
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		self.__resolve()
+
+		if not (folder, subfolder) in self.__sinks:
+			# If a subfolder is not specified the folder is named after the run
+			if subfolder is None:
+				path = self.__data_path + folder + '/' + self.__run
+			else:
+				path = self.__data_path + folder + "/" + subfolder + '/' + self.__run
+
+			if not os.path.isdir(path):
+				os.makedirs(path)
+
+			self.__sinks[(folder, subfolder)] = writer.create_sink(path)
+
+		sink = self.__sinks[(folder, subfolder)]
+		# Releases the resource
+		self.__lock.release()
+
+		return sink
+
+	def enable_telemetry(self, enabled=True):
+		"""
+		Writes values also into the SQLite telemetry database of the run
+		@ enabled bool: telemetry state
+		"""
+		self.__telemetry = enabled
+
+	def get_telemetry(self, kind):
+		"""
+		Returns the telemetry sink of a kind of values. None if telemetry is disabled
+		@ kind str: class of the values
+		"""
+		if not self.__telemetry:
+			return None
+
+		# Locks the resource
+		self.__lock.acquire()
+		self.__resolve()
+
+		if self.__database is None:
+			path = self.__data_path + "Telemetry"
+			if not os.path.isdir(path):
+				os.makedirs(path)
+			self.__database = TelemetryDatabase(path + '/' + self.__run + ".db")
+
+		if not kind in self.__telemetry_sinks:
+			self.__telemetry_sinks[kind] = TelemetrySink(self.__database, kind)
+
+		sink = self.__telemetry_sinks[kind]
+		# Releases the resource
+		self.__lock.release()
+
+		return sink
+
+registry = SinkRegistry() # Shared by every Logger
+
 class Logger():
 	"""
 	Logger Class
 	"""
 	def __init__(self, folder, subfolder=None):
 		"""
-		Creates log files named as classes
-		@ class_name str: class name
+		Gets the shared sink of the log folder
+		@ folder str: log folder
+		@ subfolder str: log subfolder
 		"""
-		# If a subfolder is not specified it is created with the current time as name
-		if subfolder is None:
-			self.__path = rospack.get_path(pkg_name) + '/data/' + folder + '/' + datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-		else:		
-			self.__path = rospack.get_path(pkg_name) + '/data/' + folder + "/" + subfolder + '/' + datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-		if not os.path.isdir(self.__path):
-			os.makedirs(self.__path)
+		self.__sink = registry.get_sink(folder, subfolder)
+		self.__telemetry = registry.get_telemetry(subfolder or folder)
+		self.__channels = dict() # Variable name -> Channel
 
 	def write_file(self, key, value):
 		"""
-		Writes data into a file
+		Writes data into a file from the background writer
 		@ key str: variable name
 		@ value float: variable value
 		"""
-		# Opens the file in write mode in the specified path
-		text_file=open(self.__path+"/"+str(key)+".txt","a")
-		text_file.write(str(datetime.now())+";"+unicode(str(value))+'\n')
-		text_file.close()
\ No newline at end of file
+		if not key in self.__channels:
+			self.__channels[key] = Channel(self.__sink, key, self.__telemetry)
+
+		self.__channels[key].write(value)
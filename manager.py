@@ -2,11 +2,15 @@
 # -*- coding: utf-8 -*-
 
 import rospy
+import rospkg
 import itertools 
+import numpy as np
 from datetime import datetime
 from copy import copy
+from threading import Lock
 from motivational_model.db_loader.loader import DbLoader
 from motivational_model.db_loader.relateobject import RelateObject
+from motivational_model.db_loader.configdiff import ConfigDiff, KINDS
 from motivational_model.classes.motivation import Motivation
 from motivational_model.classes.homeostaticvariable import HomeostaticVariable
 from motivational_model.classes.stimulus import Stimulus
@@ -14,13 +18,23 @@ from motivational_model.classes.action import Action
 from motivational_model.classes.agent import Agent
 from motivational_model.classes.effect import Effect
 from motivational_model.classes.state import State
-from motivational_model.logger.log import Logger
+from motivational_model.classes.scheduler import scheduler
+from motivational_model.classes.engine import engine
+from motivational_model.classes.snapshot import snapshot
+from motivational_model.classes.depgraph import DependencyGraph
+from motivational_model.classes.tickstats import TickStats
+from motivational_model.classes.clock import WallClock, SimulatedClock
+from motivational_model.classes.perception import perception
+from motivational_model.classes.checkpoint import Checkpoint, EVOLUTION, CURRENT_STATE, HV, EFFECT, ACTIVATION, DEACTIVATION, AGENT, STIMULUS, NONE
+from motivational_model.logger.log import Logger, writer, registry
+from motivational_model.logger.telemetry import DOMINANCE, FEEDBACK
 from motivational_model.msg import Motivations
 from proactive_decision_making.msg import ManagerFeedback
 from common_msgs.msg import KeyValuePair
 from std_msgs.msg import String
 
 pkg_name = 'motivational_model'
+rospack = rospkg.RosPack()
 
 class MotivationalModel(DbLoader, RelateObject, Logger):
     """
@@ -34,34 +48,62 @@ class MotivationalModel(DbLoader, RelateObject, Logger):
 
         # TIMESTEP used as an active pause
         self.TIMESTEP = 1.0
+        # Homeostatic Variable and Effect evolutions computed on demand from their closed form instead of stepped. States always are
+        self.LAZY_EVOLUTION = False
+        # Virtual time advancing as fast as the CPU allows instead of real time
+        self.SIMULATED_TIME = False
+        # Overrun policy. "skip" drops missed deadlines, "catch_up" runs them back to back
+        self.OVERRUN_POLICY = "skip"
+        # Experiment log format. "text" writes one file per variable, "binary" one record file per folder
+        self.LOG_FORMAT = "text"
+        writer.set_format(self.LOG_FORMAT)
+        # Logged values, dominance changes and action feedback also written into a SQLite database
+        self.TELEMETRY = False
+        registry.enable_telemetry(self.TELEMETRY)
+        # Resolved configuration cached on disk until the database changes
+        self.CONFIG_CACHE = True
+        # Database changes applied while running. Seconds between checks of the database mtime
+        self.HOT_RELOAD = False
+        self.RELOAD_INTERVAL = 5.0
+        # Runtime state saved every CHECKPOINT_INTERVAL seconds and on stop, and restored on startup
+        self.CHECKPOINT = False
+        self.CHECKPOINT_INTERVAL = 60.0
+        self.RESTORE_CHECKPOINT = False
+        # Seconds a new perceived state must be reported before it is applied, 0 applies it on the next tick
+        self.PERCEPTION_DEBOUNCE = 0.0
+        perception.set_debounce(self.PERCEPTION_DEBOUNCE)
+
+        # Clock shared by the manager and every evolution
+        if self.SIMULATED_TIME:
+            self.__clock = SimulatedClock()
+        else:
+            self.__clock = WallClock()
+        engine.set_clock(self.__clock)
         # Init database
         DbLoader.__init__(self)
         # Init logger
         Logger.__init__(self, "Experiment", "Manager")
 
-        # Data obtained from database by loader
-        te = DbLoader.get_data(self, "Temporal_Evolutions") # Temporal Evolution data list read by loader
-        std = DbLoader.get_data(self, "Standard_Evolution") # Standard Evolution Parameters data list read by loader
-        end_exo = DbLoader.get_data(self, "Endogenous_Exogenous") # Action Endogenous/Exogenous type read by loader
-        con = DbLoader.get_data(self, "Constancy") # Action Constancy read by loader
-        hv = DbLoader.get_data(self, "Homeostatic_Variables") # Homeostatic Variables data list read by loader
-        mot = DbLoader.get_data(self, "Motivations") # Motivations data list read by loader
-        sti = DbLoader.get_data(self, "Stimuli") # Stimuli data list read by loader
-        act = DbLoader.get_data(self, "Actions") # Actions data list read by loader
-        ag = DbLoader.get_data(self, "Agents") # Agents data list read by loader
-        sta = DbLoader.get_data(self, "State") # States data list read by loader
-        eff = DbLoader.get_data(self, "Actions_Effect") # Actions effect data list read by loader
+        # Configuration read from the database in one transaction and resolved, or from its compiled cache
+        config = DbLoader.load_config(self, self.CONFIG_CACHE)
+        self.__config = config # Configuration of the live object graph
+        self.__last_reload_check = self.__clock.now()
 
         # Object lists
-        self.__homeostatic_variables = RelateObject().create_hv_list(hv, std, self.TIMESTEP, True) # Homeostatic Variable Object list
-        self.__states = RelateObject().create_sta_list(sta, std, self.TIMESTEP, True) # State Object list
-        self.__effects = RelateObject().create_eff_list(eff, self.__homeostatic_variables, std, con) # Action Effect Object list
-        self.__actions = RelateObject().create_act_list(act, end_exo, self.__effects, ag) # Action Object list
-        self.__agents = RelateObject().create_ag_list(ag, self.__states, self.__actions, self.__homeostatic_variables) # Agent Object list
-        self.__stimuli = RelateObject().create_sti_list(sti, self.__states) # Stimulus Object list
-        self.__motivations = RelateObject().create_mot_list(mot, self.__homeostatic_variables, self.__stimuli, self.__agents, True) # Motivation Object list
-        
-        self.__active_actions_ids = list() # Current Active Actions
+        self.__homeostatic_variables = RelateObject().create_hv_list(config["hv"], self.TIMESTEP, True, self.LAZY_EVOLUTION) # Homeostatic Variable Object list
+        self.__states = RelateObject().create_sta_list(config["sta"], self.TIMESTEP, True) # State Object list
+        self.__effects = RelateObject().create_eff_list(config["eff"], self.__homeostatic_variables) # Action Effect Object list
+        self.__actions = RelateObject().create_act_list(config["act"], self.__effects) # Action Object list
+        self.__agents = RelateObject().create_ag_list(config["ag"], self.__states, self.__actions) # Agent Object list
+        self.__stimuli = RelateObject().create_sti_list(config["sti"], self.__states) # Stimulus Object list
+        self.__motivations = RelateObject().create_mot_list(config["mot"], self.__homeostatic_variables, self.__stimuli, self.__agents, True) # Motivation Object list
+
+        self.__active_actions_ids = set() # Current Active Actions
+        self.__lock = Lock() # Shared by the feedback callback and the configuration reload
+        self.__stopped = False # No effect is added once the evolutions are stopped
+
+        # Dependency graph and indexes
+        self.__build_indexes()
         
         self.__motivational_intensities = list() # Motivations intensities
 
@@ -70,6 +112,19 @@ class MotivationalModel(DbLoader, RelateObject, Logger):
         self.__previous_dom_mot = None
         self.__saved_previous_dom_mot = None
 
+        # Telemetry sinks, None if telemetry is disabled
+        self.__dominance_telemetry = registry.get_telemetry(DOMINANCE)
+        self.__feedback_telemetry = registry.get_telemetry(FEEDBACK)
+
+        # Main loop statistics
+        self.__tick_stats = TickStats(self.TIMESTEP)
+
+        # Runtime state of the previous execution
+        self.__checkpoint = Checkpoint(rospack.get_path(pkg_name) + "/data/Checkpoint/checkpoint.npz")
+        self.__last_checkpoint = self.__clock.now()
+        if self.RESTORE_CHECKPOINT and self.__checkpoint.exists():
+            self.restore_checkpoint()
+
         # Initializes ROS publishers and subscribers
         self.create_msg_srv()
 
@@ -82,15 +137,71 @@ class MotivationalModel(DbLoader, RelateObject, Logger):
         # Dominant Motivation Publisher
         self.__pub_mot = rospy.Publisher("motivational_model/motivations", Motivations, latch=True, queue_size=1)
 
-    def run(self):
+    def __build_indexes(self):
         """
-        Main loop.
+        Builds the dependency graph and the indexes of the object lists
         """
+        # Computes every motivation intensity at once, reading only changed values
+        self.__graph = DependencyGraph(self.__motivations)
+
+        # Motivation positions in the intensity vector
+        self.__mot_index = {mot.get_id(): idx for idx, mot in enumerate(self.__motivations)}
+        self.__none_idx = None
+        for idx, mot in enumerate(self.__motivations):
+            if mot.get_name() == "none":
+                self.__none_idx = idx
+
+        # Feedback indexes
+        action_index = dict() # Action name -> Action objects
+        for agent in self.__agents:
+            for action in agent.get_actions():
+                action_index.setdefault(action.get_name(), list()).append(action)
+
+        hv_index = {hv.get_id(): hv for hv in self.__homeostatic_variables}
+        effect_hvs = dict() # Effect id -> Homeostatic Variable objects it modifies
+        for effect in self.__effects:
+            effect_hvs[effect.get_id()] = [hv_index[hv_id] for hv_id in effect.get_related_hv() if hv_id in hv_index]
+
+        # Replaced at once, feedback callbacks see either the previous or the new indexes
+        self.__action_index = action_index
+        self.__effect_hvs = effect_hvs
+
+    def run(self, duration=None):
+        """
+        Main loop. Ticks at absolute deadlines every TIMESTEP, so execution time does not add drift.
+        @ duration float: seconds to run, None runs until shutdown
+        """
+        deadline = self.__clock.now()
+        end = None
+        if duration is not None:
+            end = deadline + duration
+
         # While node is active
-        while not rospy.is_shutdown():
+        while not rospy.is_shutdown() and (end is None or self.__clock.now() < end):
 
+            start = self.__clock.now()
             self.__execute()
-            rospy.sleep(self.TIMESTEP)
+            now = self.__clock.now()
+
+            deadline += self.TIMESTEP
+            overrun = now > deadline
+            skipped = 0
+
+            if overrun and self.OVERRUN_POLICY == "skip":
+                # Next deadline is the first one still ahead
+                skipped = int((now - deadline)//self.TIMESTEP) + 1
+                deadline += skipped*self.TIMESTEP
+
+            self.__tick_stats.record(now - start, overrun, skipped)
+
+            # Evolutions advance meanwhile. With simulated time this returns immediately
+            scheduler.sleep_until(deadline)
+
+    def get_loop_stats(self):
+        """
+        Returns main loop tick latency and overrun counters
+        """
+        return self.__tick_stats.get_stats()
 
     def stop(self):
         """
@@ -100,59 +211,459 @@ class MotivationalModel(DbLoader, RelateObject, Logger):
         """
         rospy.loginfo("Stopping motivational manager and closing threads...")
 
-        # Stops all threads running simultaneously
+        # Saves the runtime state before the evolutions stop
+        if self.CHECKPOINT:
+            self.save_checkpoint()
+
+        # Locks the resource
+        self.__lock.acquire()
+        self.__stopped = True
+        # Stops all evolutions driven by the scheduler
         for hv in self.__homeostatic_variables:
-            # Stops main evolution
-            hv.get_evol().stop()
-            # Stops effects
-            for ef in hv.get_effects():
-                ef.stop()
+            self.__stop_hv(hv)
 
         for a in self.__agents:
             for s in a.get_states():
-                s.get_activation().stop()
-                s.get_deactivation().stop()
+                self.__stop_state(s)
 
         for es in self.__stimuli:
             for s in es.get_states():
-                s.get_activation().stop()
-                s.get_deactivation().stop()
+                self.__stop_state(s)
+        # Releases the resource
+        self.__lock.release()
+
+        # Stops the scheduler thread
+        scheduler.stop()
+
+        stats = scheduler.get_stats()
+        rospy.loginfo("Scheduler wakeups: %d, idle wakeups: %d, idle polls: %d", stats["wakeups"], stats["idle_wakeups"], stats["idle_polls"])
+
+        stats = self.get_loop_stats()
+        rospy.loginfo("Main loop ticks: %d, overruns: %d, skipped: %d, mean latency: %.4f s, max latency: %.4f s", stats["ticks"], stats["overruns"], stats["skipped"], stats["mean_latency"], stats["max_latency"])
+
+        stats = perception.get_stats()
+        rospy.loginfo("Perception reports: %d, coalesced: %d, debounced: %d, applied: %d", stats["received"], stats["coalesced"], stats["debounced"], stats["applied"])
+
+        # Writes every pending log line
+        writer.stop()
+        if writer.get_dropped():
+            rospy.logwarn("%d log lines were dropped", writer.get_dropped())
 
         rospy.loginfo("Every Thread closed successfully.")
  
+    def save_checkpoint(self):
+        """
+        Writes the runtime state into the checkpoint file
+        """
+        rows = list() # Evolution rows
+        keys = list() # (kind, owner id, id) of every row
+
+        # Locks the resource. Action feedback changes the active actions and effects
+        self.__lock.acquire()
+        for hv in self.__homeostatic_variables:
+            rows.append(hv.get_hv_evol().get_row())
+            keys.append((HV, hv.get_id(), hv.get_id()))
+            for evol in hv.get_active_eff_evols():
+                rows.append(evol.get_row())
+                keys.append((EFFECT, hv.get_id(), evol.get_id()))
+
+        for state in self.__states:
+            rows.append(state.get_evolution().get_row())
+            keys.append((ACTIVATION if state.is_active() else DEACTIVATION, state.get_id(), state.get_id()))
+
+        # Every row is read at once
+        value, fn_time, evolving = engine.save_rows(rows)
+        active_actions = list(self.__active_actions_ids)
+        # Releases the resource
+        self.__lock.release()
+
+        evolutions = np.zeros(len(rows), dtype=EVOLUTION)
+        evolutions["kind"] = [key[0] for key in keys]
+        evolutions["owner"] = [key[1] for key in keys]
+        evolutions["id"] = [key[2] for key in keys]
+        evolutions["value"] = value
+        evolutions["fn_time"] = fn_time
+        evolutions["evolving"] = evolving
+
+        entities = [(AGENT, ag) for ag in self.__agents] + [(STIMULUS, sti) for sti in self.__stimuli]
+        current_states = np.zeros(len(entities), dtype=CURRENT_STATE)
+        for idx, (kind, entity) in enumerate(entities):
+            state = entity.get_current_state()
+            current_states[idx] = (kind, entity.get_id(), NONE if state is None else state.get_id())
+
+        dominant = [NONE if mot is None else mot.get_id() for mot in [self.__current_dom_mot, self.__previous_dom_mot, self.__saved_previous_dom_mot]]
+
+        try:
+            self.__checkpoint.save(evolutions, current_states, active_actions, dominant)
+        except (IOError, OSError) as e:
+            rospy.logerr("Checkpoint could not be written: %s", e)
+
+    def restore_checkpoint(self):
+        """
+        Restores the runtime state from the checkpoint file
+        Entities no longer in the database are ignored
+        """
+        try:
+            evolutions, current_states, active_actions, dominant = self.__checkpoint.load()
+        except Exception as e:
+            rospy.logerr("Checkpoint could not be read: %s", e)
+            return
+
+        hvs = {hv.get_id(): hv for hv in self.__homeostatic_variables}
+        states = {state.get_id(): state for state in self.__states}
+        effects = {effect.get_id(): effect for effect in self.__effects}
+        actions = set([action.get_id() for action in self.__actions])
+
+        # Active actions and the evolutions of their effects
+        self.__active_actions_ids = set([id for id in active_actions if id in actions])
+
+        for record in evolutions[evolutions["kind"] == EFFECT]:
+            hv = hvs.get(int(record["owner"]))
+            effect = effects.get(int(record["id"]))
+            if hv is not None and effect is not None:
+                hv.add_effect(effect)
+
+        # Current states are activated before their evolutions are overwritten
+        for kind, id, state_id in current_states:
+            entities = self.__agents if kind == AGENT else self.__stimuli
+            for entity in entities:
+                if entity.get_id() == id and states.get(int(state_id)) in entity.get_states():
+                    entity.set_states(entity.get_states(), states[int(state_id)])
+
+        rows = list()
+        indexes = list()
+        for idx, record in enumerate(evolutions):
+            evol = self.__get_evolution(int(record["kind"]), int(record["owner"]), int(record["id"]), hvs, states)
+            if evol is not None:
+                rows.append(evol.get_row())
+                indexes.append(idx)
+
+        # Every row is written at once
+        evolutions = evolutions[indexes]
+        engine.restore_rows(rows, evolutions["value"], evolutions["fn_time"], evolutions["evolving"])
+
+        # Dominant motivations
+        motivations = {mot.get_id(): mot for mot in self.__motivations}
+        current, previous, saved_previous = [copy(motivations[id]) if id in motivations else None for id in dominant]
+        self.__current_dom_mot = current
+        self.__previous_dom_mot = previous
+        self.__saved_previous_dom_mot = saved_previous
+
+        rospy.loginfo("Runtime state restored from checkpoint")
+
+    def __get_evolution(self, kind, owner, id, hvs, states):
+        """
+        Returns the evolution of a checkpoint record. None if it no longer exists
+        @ kind int: HV, EFFECT, ACTIVATION or DEACTIVATION
+        @ owner int: Homeostatic Variable or State id
+        @ id int: evolution id
+        @ hvs dict: id -> Homeostatic Variable object
+        @ states dict: id -> State object
+        """
+        if kind in [HV, EFFECT]:
+            if not owner in hvs:
+                return None
+            if kind == HV:
+                return hvs[owner].get_hv_evol()
+            return hvs[owner].get_eff_evol(id)
+
+        if not owner in states:
+            return None
+        # The State follows the parameters it had when saved
+        states[owner].set_phase(kind == ACTIVATION)
+        return states[owner].get_evolution()
+
+    def __check_checkpoint(self):
+        """
+        Writes the checkpoint every CHECKPOINT_INTERVAL
+        """
+        now = self.__clock.now()
+        if now - self.__last_checkpoint >= self.CHECKPOINT_INTERVAL:
+            self.__last_checkpoint = now
+            self.save_checkpoint()
+
+    def __stop_hv(self, hv):
+        """
+        Stops the evolutions of a Homeostatic Variable
+        @ hv HomeostaticVariable: Homeostatic Variable object
+        """
+        # Stops main evolution
+        hv.get_hv_evol().stop()
+        # Stops effects
+        for ef in hv.get_eff_evols():
+            ef.stop()
+
+    def __stop_state(self, state):
+        """
+        Stops the evolutions of a State
+        @ state State: State object
+        """
+        state.stop()
+
+    def __check_reload(self):
+        """
+        Reloads the configuration every RELOAD_INTERVAL if the database has been modified
+        """
+        now = self.__clock.now()
+        if now - self.__last_reload_check < self.RELOAD_INTERVAL:
+            return
+        self.__last_reload_check = now
+
+        if not DbLoader.has_changed(self):
+            return
+
+        # Locks the resource. Action feedback is not handled while the object graph changes
+        self.__lock.acquire()
+        try:
+            self.__reload()
+        finally:
+            # Releases the resource
+            self.__lock.release()
+
+    def __reload(self):
+        """
+        Reads the modified database and applies its differences to the object graph
+        """
+        try:
+            config = DbLoader.load_config(self, self.CONFIG_CACHE)
+        except Exception as e:
+            rospy.logerr("Database could not be reloaded: %s", e)
+            return
+
+        # Every evolution must have its parameters before anything is applied
+        for kind, keys in [("hv", ["params_std"]), ("sta", ["params_act", "params_deact"]), ("eff", ["params_std"])]:
+            for row in config[kind]:
+                if any([row[key] is None for key in keys]):
+                    rospy.logerr("Database not reloaded, %s %s has no evolution parameters", kind, row["id"])
+                    return
+
+        diff = ConfigDiff(self.__config, config)
+        if not diff.is_empty():
+            rospy.loginfo("Database modified, applying changes...")
+            self.__apply(config, diff)
+
+        self.__config = config
+
+    def __apply(self, config, diff):
+        """
+        Applies the differences with the new configuration to the live object graph.
+        Unaffected evolutions keep running with their current values
+        @ config dict: new resolved configuration
+        @ diff ConfigDiff: differences with the live configuration
+        """
+        rows = dict() # Kind -> id -> resolved row
+        for kind in KINDS:
+            rows[kind] = {row["id"]: row for row in config[kind]}
+
+        # Active actions whose effects changed, removed now and added again once the objects are rebuilt
+        changed_effects = set(diff.get_removed("eff")) | set(diff.get_changed("eff").keys())
+        changed_actions = set(diff.get_removed("act")) | set(diff.get_changed("act").keys())
+        stale = set() # Active action ids
+
+        for action_list in self.__action_index.values():
+            for action in action_list:
+                if action.get_id() in self.__active_actions_ids:
+                    effect_ids = [effect.get_id() for effect in action.get_effects()]
+
+                    if action.get_id() in changed_actions or changed_effects.intersection(effect_ids):
+                        stale.add(action.get_id())
+                        for effect_id in effect_ids:
+                            for hv in self.__effect_hvs.get(effect_id, list()):
+                                hv.remove_effect(effect_id)
+
+        # Homeostatic Variables
+        hvs = {hv.get_id(): hv for hv in self.__homeostatic_variables}
+        rebuilt = dict() # New Homeostatic Variable object -> replaced object, None if it is new
+        for id in diff.get_removed("hv"):
+            self.__stop_hv(hvs.pop(id))
+
+        for id, fields in diff.get_changed("hv").items():
+            if fields <= set(["std_evol", "params_std"]):
+                hvs[id].set_params_std(rows["hv"][id]["params_std"])
+            else:
+                # Rebuilt keeping the current point of its evolution
+                hv = hvs[id]
+                hvs[id] = RelateObject().create_hv_list([rows["hv"][id]], self.TIMESTEP, True, self.LAZY_EVOLUTION)[0]
+                hvs[id].get_hv_evol().resume(hv.get_hv_evol())
+                rebuilt[hvs[id]] = hv
+
+        for id in diff.get_added("hv"):
+            hvs[id] = RelateObject().create_hv_list([rows["hv"][id]], self.TIMESTEP, True, self.LAZY_EVOLUTION)[0]
+            rebuilt[hvs[id]] = None
+
+        self.__homeostatic_variables = [hvs[row["id"]] for row in config["hv"]]
+
+        # States
+        states = {state.get_id(): state for state in self.__states}
+        for id in diff.get_removed("sta"):
+            self.__stop_state(states.pop(id))
+
+        for id, fields in diff.get_changed("sta").items():
+            if fields <= set(["activation_evol", "deactivation_evol", "params_act", "params_deact"]):
+                states[id].set_params(rows["sta"][id]["params_act"], rows["sta"][id]["params_deact"])
+            else:
+                # Rebuilt keeping its phase and the current point of its evolution
+                state = states[id]
+                states[id] = RelateObject().create_sta_list([rows["sta"][id]], self.TIMESTEP, True)[0]
+                states[id].set_phase(state.is_active())
+                states[id].get_evolution().resume(state.get_evolution())
+                self.__stop_state(state)
+
+        for id in diff.get_added("sta"):
+            states[id] = RelateObject().create_sta_list([rows["sta"][id]], self.TIMESTEP, True)[0]
+
+        self.__states = [states[row["id"]] for row in config["sta"]]
+
+        # Effects and Actions hold no evolution, they are rebuilt
+        self.__effects = RelateObject().create_eff_list(config["eff"], self.__homeostatic_variables)
+        self.__actions = RelateObject().create_act_list(config["act"], self.__effects)
+        actions = {action.get_id(): action for action in self.__actions}
+
+        # Agents and Stimuli keep their subscribers unless their perception changed
+        perception = set(["name", "topic", "msg", "pkg"])
+
+        agents = {agent.get_id(): agent for agent in self.__agents}
+        for id in diff.get_removed("ag"):
+            agents.pop(id).stop()
+
+        for id in diff.get_added("ag") + [id for id, fields in diff.get_changed("ag").items() if fields & perception]:
+            row = rows["ag"][id]
+            if id in agents:
+                # The rebuilt Agent keeps the State it was perceiving
+                current = self.__get_current_state(agents[id].get_current_state(), row, states)
+                row = dict(row, current_state=None if current is None else current.get_id())
+                agents[id].stop()
+            agents[id] = RelateObject().create_ag_list([row], self.__states, self.__actions)[0]
+
+        for agent in agents.values():
+            row = rows["ag"][agent.get_id()]
+            agent.set_states([states[x] for x in row["states"]], self.__get_current_state(agent.get_current_state(), row, states))
+            agent.set_actions([actions[x] for x in row["actions"]])
+
+        self.__agents = [agents[row["id"]] for row in config["ag"]]
+
+        stimuli = {sti.get_id(): sti for sti in self.__stimuli}
+        for id in diff.get_removed("sti"):
+            stimuli.pop(id).stop()
+
+        for id in diff.get_added("sti") + [id for id, fields in diff.get_changed("sti").items() if fields & perception]:
+            row = rows["sti"][id]
+            if id in stimuli:
+                # The rebuilt Stimulus keeps the State it was perceiving
+                current = self.__get_current_state(stimuli[id].get_current_state(), row, states)
+                row = dict(row, current_state=None if current is None else current.get_id())
+                stimuli[id].stop()
+            stimuli[id] = RelateObject().create_sti_list([row], self.__states)[0]
+
+        for sti in stimuli.values():
+            row = rows["sti"][sti.get_id()]
+            sti.set_states([states[x] for x in row["states"]], self.__get_current_state(sti.get_current_state(), row, states))
+
+        self.__stimuli = [stimuli[row["id"]] for row in config["sti"]]
+
+        # Motivations keep their logs unless their name changed
+        motivations = {mot.get_id(): mot for mot in self.__motivations}
+        for id in diff.get_added("mot") + [id for id, fields in diff.get_changed("mot").items() if "name" in fields]:
+            motivations[id] = RelateObject().create_mot_list([rows["mot"][id]], self.__homeostatic_variables, self.__stimuli, self.__agents, True)[0]
+
+        for id in diff.get_removed("mot"):
+            motivations.pop(id)
+
+        for mot in motivations.values():
+            row = rows["mot"][mot.get_id()]
+            mot.set_threshold(row["threshold"])
+            mot.set_related([hvs[x] for x in row["related_hv"] if x in hvs], [stimuli[x] for x in row["related_sti"] if x in stimuli], [agents[x] for x in row["related_ag"] if x in agents])
+
+        self.__motivations = [motivations[row["id"]] for row in config["mot"]]
+
+        # Dominant motivations that no longer exist are selected again
+        if self.__current_dom_mot is not None and not self.__current_dom_mot.get_id() in motivations:
+            self.__current_dom_mot = None
+        if self.__previous_dom_mot is not None and not self.__previous_dom_mot.get_id() in motivations:
+            self.__previous_dom_mot = None
+
+        self.__build_indexes()
+
+        # Effects of the actions still active, on every Homeostatic Variable if the action was stale
+        self.__active_actions_ids = set([id for id in self.__active_actions_ids if id in actions])
+        for id in self.__active_actions_ids:
+            for effect in actions[id].get_effects():
+                for hv in self.__effect_hvs[effect.get_id()]:
+                    if id in stale or hv in rebuilt:
+                        hv.add_effect(effect)
+
+                        # Effects of a replaced Homeostatic Variable continue from their current point
+                        previous = rebuilt.get(hv)
+                        if not id in stale and previous is not None and previous.get_eff_evol(effect.get_id()) is not None:
+                            hv.get_eff_evol(effect.get_id()).resume(previous.get_eff_evol(effect.get_id()))
+
+        # Replaced Homeostatic Variables are stopped once their evolutions have been carried over
+        for hv in rebuilt.values():
+            if hv is not None:
+                self.__stop_hv(hv)
+
+    def __get_current_state(self, current, row, states):
+        """
+        Returns the State an Agent or Stimulus keeps after a reload
+        @ current State: State the entity had before the reload
+        @ row dict: resolved entity data
+        @ states dict: id -> State object
+        """
+        if current is not None and current.get_id() in row["states"]:
+            return states[current.get_id()]
+
+        return states.get(row["current_state"])
+
     def __callback(self, msg):
         """
         Callback Method receives Action information
         @ msg ManagerFeedback: actions status
-        Creates a list with Current Active Action IDs
-        """
-        if bool(msg.action) and msg.app_status in [ManagerFeedback().STARTED,ManagerFeedback().STOPPED]:
-            for agent in self.__agents:
-                for action in agent.get_actions():
-                    if action.get_name() == msg.action:
-                        if msg.app_status in [ManagerFeedback().STARTED]:
-                            if action.get_id() not in self.__active_actions_ids:
-                                # Creates effects
-                                for effect in action.get_effects():
-                                    for hv in self.__homeostatic_variables:
-                                        if hv.get_id() in effect.get_related_hv():
-                                            hv.add_effect(effect)
-                                # Saves action
-                                self.__active_actions_ids.append(action.get_id())
-
-                        elif msg.app_status in [ManagerFeedback().STOPPED, ManagerFeedback().CANCELLED, ManagerFeedback().PAUSED, ManagerFeedback().COMPLETED]:
-                            if action.get_id() in self.__active_actions:
-                                # Removes effects
-                                for effect in action.get_effects():
-                                    for hv in self.__homeostatic_variables:
-                                        if hv.get_id() in effect.get_related_hv():
-                                            hv.remove_effect(effect.get_id())
-                                self.__active_actions.remove(action.get_id())
+        Updates the set of Current Active Action IDs
+        """
+        if self.__feedback_telemetry is not None:
+            writer.write(self.__feedback_telemetry, FEEDBACK, (msg.action, msg.app_status))
+
+        # Locks the resource
+        self.__lock.acquire()
+        try:
+            if not self.__stopped and bool(msg.action) and msg.app_status in [ManagerFeedback.STARTED, ManagerFeedback.STOPPED]:
+                for action in self.__action_index.get(msg.action, list()):
+                    if msg.app_status in [ManagerFeedback.STARTED]:
+                        if action.get_id() not in self.__active_actions_ids:
+                            # Creates effects
+                            for effect in action.get_effects():
+                                for hv in self.__effect_hvs[effect.get_id()]:
+                                    hv.add_effect(effect)
+                            # Saves action
+                            self.__active_actions_ids.add(action.get_id())
+
+                    elif msg.app_status in [ManagerFeedback.STOPPED, ManagerFeedback.CANCELLED, ManagerFeedback.PAUSED, ManagerFeedback.COMPLETED]:
+                        if action.get_id() in self.__active_actions_ids:
+                            # Removes effects
+                            for effect in action.get_effects():
+                                for hv in self.__effect_hvs[effect.get_id()]:
+                                    hv.remove_effect(effect.get_id())
+                            self.__active_actions_ids.remove(action.get_id())
+        finally:
+            # Releases the resource
+            self.__lock.release()
 
     def __execute(self):
         """
         Replaces evolution parameters due to action presence
         """
+        # Applies the database changes
+        if self.HOT_RELOAD:
+            self.__check_reload()
+
+        # Applies the latest perceived states
+        perception.apply()
+
+        # Reads every evolution once. Values are cached until the next tick
+        snapshot.take()
+        # Recomputes the intensities if any related value changed
+        self.__graph.update()
+
         # Gets current dominant motivation 
         self.__current_dom_mot, self.__motivational_intensities = self.__get_mot_dominant(copy(self.__current_dom_mot), self.__motivations)
 
@@ -163,12 +674,19 @@ class MotivationalModel(DbLoader, RelateObject, Logger):
         else:
             if self.__current_dom_mot.get_id() != self.__previous_dom_mot.get_id():
                 # The dominant motivation has changed
+                if self.__dominance_telemetry is not None:
+                    writer.write(self.__dominance_telemetry, DOMINANCE, (self.__previous_dom_mot.get_name(), self.__current_dom_mot.get_name()))
+
                 self.__saved_previous_dom_mot = self.__previous_dom_mot
                 self.__previous_dom_mot = self.__current_dom_mot 
 
         # Publishes info every timestep
         self.__pub_mot.publish(dominant=self.__current_dom_mot.get_name(), intensities=self.__motivational_intensities)
 
+        # Saves the runtime state
+        if self.CHECKPOINT:
+            self.__check_checkpoint()
+
     def __get_mot_dominant(self, current_dom_mot, motivations):
         """
         @ current_dom_mot Motivation: copy of the actual dominant motivation
@@ -177,29 +695,35 @@ class MotivationalModel(DbLoader, RelateObject, Logger):
         @ returns intensities list: motivational intensities list
         """
         intensities = list()
-        aux_mot = None
+
+        values = self.__graph.get_intensities()
+        above = values >= self.__graph.get_thresholds()
 
         if current_dom_mot is None:
+            current_idx = None
             max_value = 0
         else:
-            max_value = current_dom_mot.get_value()
-            current_dom_mot = None
-
-       for mot in motivations:
-            if mot.get_value() >= mot.get_threshold():
-                if mot.get_value() > max_value or (mot.get_name() == self.__current_dom_mot.get_name() and mot.get_value() >= max_value):
-                    current_dom_mot = copy(mot)
-                    max_value = mot.get_value()
-            if mot.get_name() == "none":
-                aux_mot = mot
-            mot.save()
-            
+            current_idx = self.__mot_index[current_dom_mot.get_id()]
+            max_value = values[current_idx]
+
+        # The highest motivation above its threshold replaces the current one only if it is higher
+        candidates = above & (values > max_value)
+
+        if candidates.any():
+            dom_idx = int(np.argmax(np.where(candidates, values, -np.inf)))
+        elif current_idx is not None and above[current_idx]:
+            dom_idx = current_idx
+        else:
+            dom_idx = self.__none_idx
+
+        current_dom_mot = None
+        if dom_idx is not None:
+            current_dom_mot = copy(motivations[dom_idx])
+
+        for mot in motivations:
             # Get motivational intensities
             intensities.append(KeyValuePair(key=mot.get_name(), value=str(mot.get_value())))
             # Log info message
             rospy.loginfo("\tValue of %s is %.2f", mot.get_name(), mot.get_value())
 
-        if current_dom_mot is None:
-            current_dom_mot = copy(aux_mot)
-
-        return current_dom_mot, intensities
\ No newline at end of file
+        return current_dom_mot, intensities
@@ -4,6 +4,7 @@
 from motivational_model.classes.homeostaticvariable import HomeostaticVariable
 from motivational_model.classes.stimulus import Stimulus
 from motivational_model.classes.agent import Agent
+from motivational_model.classes.snapshot import snapshot
 from motivational_model.logger.log import Logger
 
 ALPHA = 0.01
@@ -23,6 +24,8 @@ class Motivation(Logger):
 		self.__related_ag = list() # Stores related Agents
 
 		self.__value = 0
+		self.__tick = None # Snapshot tick of the value
+		self.__intensity = None # Computed by the dependency graph. None computes it from related values
 
 		# Logger
 		self.__logging = logging
@@ -45,6 +48,13 @@ class Motivation(Logger):
 		Returns Motivation threslhold value
 		"""
 		return self.__threshold
+
+	def set_threshold(self, threshold):
+		"""
+		Sets Motivation threshold value
+		@ threshold float: threshold value
+		"""
+		self.__threshold = threshold
 	
 	def add_hv(self, var):
 		"""
@@ -66,10 +76,72 @@ class Motivation(Logger):
 		@ var Agent: Agent object
 		"""
 		self.__related_ag.append(var)
+
+	def get_related_hv(self):
+		"""
+		Returns related Homeostatic Variable objects list
+		"""
+		return self.__related_hv
+
+	def get_related_sti(self):
+		"""
+		Returns related Stimulus objects list
+		"""
+		return self.__related_sti
+
+	def get_related_ag(self):
+		"""
+		Returns related Agent objects list
+		"""
+		return self.__related_ag
+
+	def set_related(self, homeostatic_variables, stimuli, agents):
+		"""
+		Replaces every related object
+		@ homeostatic_variables list: Homeostatic Variable objects
+		@ stimuli list: Stimulus objects
+		@ agents list: Agent objects
+		"""
+		self.__related_hv = list(homeostatic_variables)
+		self.__related_sti = list(stimuli)
+		self.__related_ag = list(agents)
+		self.__intensity = None
+		self.__tick = None
+
+	def set_intensity(self, value):
+		"""
+		Sets the intensity computed by the dependency graph
+		@ value float: Motivation value
+		"""
+		self.__intensity = value
+		self.__tick = None
 	
 	def get_value(self):
 		"""
 		Returns Motivation Deficit value
+		Computed once per snapshot tick against the frozen evolution values
+		"""
+		tick = snapshot.get_tick()
+		if tick is not None and tick == self.__tick:
+			return self.__value
+
+		if self.__intensity is not None:
+			value = self.__intensity
+		else:
+			value = self.__compute_value()
+
+		if self.__logging and value != self.__value:
+
+			Logger.write_file(self, self.__name, value) # Writes Motivation name and value
+
+		self.__value = value
+		self.__tick = tick
+
+		return value
+
+	def __compute_value(self):
+		"""
+		Computes Motivation value from every related value
 		"""
 		hv_sum = 0
 		sti_sum = 0
@@ -100,8 +172,4 @@ class Motivation(Logger):
 
 		value = hv_value + ALPHA*hv_value*es_value
 
-		if self.__logging and value != self.__value:
-
-			Logger.write_file(self, self.__name, self.__value) # Writes Motivation name and value
-
-		return value
\ No newline at end of file
+		return value
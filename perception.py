@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+from motivational_model.classes.engine import engine
+
+DEBOUNCE = 0.0 # Seconds a new state must be reported before it is applied, 0 applies it on the next tick
+
+class PerceptionBuffer():
+	"""
+	Perception Buffer Class
+	Keeps the latest state reported for every Agent and Stimulus between model ticks
+	and applies it once per tick, optionally after a debounce time per state
+	"""
+	def __init__(self, debounce=DEBOUNCE):
+		"""
+		@ debounce float: default debounce time in seconds
+		"""
+		self.__debounce = debounce
+		self.__state_debounce = dict() # State name -> debounce time
+
+		self.__pending = dict() # Entity -> (state name, setter, report time)
+		self.__candidates = dict() # Entity -> (state name, setter, first report time) waiting for the debounce time
+
+		# Counters
+		self.__received = 0 # Reports received
+		self.__coalesced = 0 # Reports replaced by a later one before the tick
+		self.__debounced = 0 # Reports discarded before their debounce time
+		self.__applied = 0 # State changes applied
+
+		self.__lock = Lock()
+
+	def set_debounce(self, debounce, state=None):
+		"""
+		Sets the debounce time
+		@ debounce float: seconds a new state must be reported before it is applied
+		@ state str: state name, None sets the default
+		"""
+		if state is None:
+			self.__debounce = debounce
+		else:
+			self.__state_debounce[state] = debounce
+
+	def report(self, entity, state, setter):
+		"""
+		Stores the state reported for an entity until the next tick
+		@ entity Agent or Stimulus: perceived entity
+		@ state str: reported state name
+		@ setter function: applies a state name to the entity
+		"""
+		now = engine.get_clock().now()
+
+		# Locks the resource
+		self.__lock.acquire()
+		self.__received += 1
+		if entity in self.__pending:
+			self.__coalesced += 1
+		self.__pending[entity] = (state, setter, now)
+		# Releases the resource
+		self.__lock.release()
+
+	def apply(self):
+		"""
+		Applies the latest reported states. Called once per model tick
+		"""
+		# Locks the resource
+		self.__lock.acquire()
+		pending = self.__pending
+		self.__pending = dict()
+		# Releases the resource
+		self.__lock.release()
+
+		now = engine.get_clock().now()
+
+		for entity, (state, setter, stamp) in pending.items():
+			current = entity.get_current_state()
+
+			if current is not None and current.get_name() == state:
+				# Reports of the current state cancel any state waiting for its debounce time
+				if entity in self.__candidates:
+					del self.__candidates[entity]
+					self.__debounced += 1
+				continue
+
+			candidate = self.__candidates.get(entity)
+			if candidate is not None and candidate[0] == state:
+				# Keeps the time of the first report
+				stamp = candidate[2]
+			elif candidate is not None:
+				self.__debounced += 1
+
+			self.__candidates[entity] = (state, setter, stamp)
+
+		for entity, (state, setter, stamp) in list(self.__candidates.items()):
+			if now - stamp >= self.__state_debounce.get(state, self.__debounce):
+				del self.__candidates[entity]
+				setter(state)
+				self.__applied += 1
+
+	def get_stats(self):
+		"""
+		Returns perception counters
+		"""
+		return {"received": self.__received, "coalesced": self.__coalesced, "debounced": self.__debounced, "applied": self.__applied}
+
+perception = PerceptionBuffer() # Shared by every Agent and Stimulus
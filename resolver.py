@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from rospy import logerr
+
+class Resolver():
+    """
+    Resolver Class
+    Resolves the rows read from the database into plain data with every
+    foreign key list parsed once and every referenced row found through
+    id -> row dicts, so the whole configuration is resolved in linear time
+    """
+    def __init__(self, tables):
+        """
+        Indexes every table by id
+        @ tables dict: table name -> rows read from the database
+        """
+        self.__tables = tables
+        self.__index = dict() # Table name -> (id -> row)
+
+        for name, rows in tables.items():
+            self.__index[name] = dict((row["id"], row) for row in rows)
+
+    def get_int_list(self, related_var):
+        """
+        Transforms str data from database into int lists
+        @ related_var str: data variable
+        - Splits str (TEXT) data from database
+        - Checks all entries are digits
+        - Converts all entries to int
+        """
+        aux_var = list()
+        x_list = list()
+
+        if isinstance(related_var, (str, unicode)):
+            aux_var = related_var.split(",")
+        elif bool(related_var):
+            aux_var.append(related_var)
+
+        for x in aux_var:
+            x = unicode(x).strip()
+
+            if x.isdigit():
+                if not int(x) in x_list:
+                    x_list.append(int(x))
+            elif x:
+                logerr("related_var given is not correct")
+
+        return x_list
+
+    def get_row(self, table, id):
+        """
+        Returns the row of a table with the given id. None if there is none
+        @ table str: table name
+        @ id int: row id
+        """
+        return self.__index[table].get(id)
+
+    def get_params(self, std_id):
+        """
+        Returns the evolution parameters of a Standard Evolution row
+        @ std_id int: Standard Evolution id
+        """
+        std_var = self.get_row("Standard_Evolution", std_id)
+
+        if std_var is None:
+            logerr("Standard_Evolution "+str(std_id)+" does not exist")
+            return None
+
+        return {"te_id": std_var['type'], "slope": std_var['slope'], "tau": std_var['tau'], "step": std_var['step']}
+
+    def __get_name(self, table, id):
+        """
+        Returns the name of a row. None if there is none
+        @ table str: table name
+        @ id int: row id
+        """
+        row = self.get_row(table, id)
+
+        if row is None:
+            return None
+
+        return row["name"]
+
+    def __group(self, rows, key):
+        """
+        Groups the ids of a table by the value of one of its columns
+        @ rows list: table rows
+        @ key str: column name
+        @ returns dict: column value -> list of ids in table order
+        """
+        groups = dict()
+
+        for row in rows:
+            groups.setdefault(row[key], list()).append(row["id"])
+
+        return groups
+
+    def resolve(self):
+        """
+        Resolves every table used to build the object graph
+        @ returns dict: "hv", "sta", "eff", "act", "ag", "sti" and "mot" lists of resolved rows
+        """
+        tables = self.__tables
+        config = dict()
+
+        config["hv"] = list()
+        for i in tables["Homeostatic_Variables"]:
+            row = dict(i)
+            row["params_std"] = self.get_params(i["std_evol"])
+            config["hv"].append(row)
+
+        config["sta"] = list()
+        for i in tables["State"]:
+            row = dict(i)
+            row["params_act"] = self.get_params(i["activation_evol"])
+            row["params_deact"] = self.get_params(i["deactivation_evol"])
+            config["sta"].append(row)
+
+        config["eff"] = list()
+        for i in tables["Actions_Effect"]:
+            row = dict(i)
+            row["params_std"] = self.get_params(i["std_evol"])
+            row["constancy_name"] = self.__get_name("Constancy", i["constancy"])
+            row["related_hv"] = self.get_int_list(i["related_hv"])
+            config["eff"].append(row)
+
+        config["act"] = list()
+        for i in tables["Actions"]:
+            row = dict(i)
+            row["type_name"] = self.__get_name("Endogenous_Exogenous", i["type"])
+            row["effects"] = self.get_int_list(i["effects"])
+            config["act"].append(row)
+
+        # States and Actions grouped by the entity they belong to
+        ag_states = self.__group(tables["State"], "related_ag")
+        sti_states = self.__group(tables["State"], "related_sti")
+        ag_actions = self.__group(tables["Actions"], "related_ag")
+
+        config["ag"] = list()
+        for i in tables["Agents"]:
+            row = dict(i)
+            row["states"] = ag_states.get(i["id"], list())
+            row["actions"] = ag_actions.get(i["id"], list())
+            config["ag"].append(row)
+
+        config["sti"] = list()
+        for i in tables["Stimuli"]:
+            row = dict(i)
+            row["states"] = sti_states.get(i["id"], list())
+            config["sti"].append(row)
+
+        config["mot"] = list()
+        for i in tables["Motivations"]:
+            row = dict(i)
+            row["related_hv"] = self.get_int_list(i["related_hv"])
+            row["related_sti"] = self.get_int_list(i["related_sti"])
+            row["related_ag"] = self.get_int_list(i["related_ag"])
+            config["mot"].append(row)
+
+        return config
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+from rospy import Subscriber
+from handlers.functions import my_import
+
+class PerceptionRouter():
+	"""
+	Perception Router Class
+	Subscribes once per topic and message type and hands every message
+	to the callbacks registered for its frame_id
+	"""
+	def __init__(self):
+
+		self.__msg_classes = dict() # (pkg, msg) -> message class
+		self.__subscribers = dict() # (topic, message class) -> Subscriber
+		self.__routes = dict() # (topic, message class) -> frame_id -> callbacks
+
+		self.__lock = Lock()
+
+	def get_msg_class(self, pkg, msg):
+		"""
+		Returns a message class, imported the first time
+		@ pkg str: message package
+		@ msg str: message name
+		"""
+		if not (pkg, msg) in self.__msg_classes:
+			self.__msg_classes[(pkg, msg)] = my_import(pkg+".msg", msg)
+
+		return self.__msg_classes[(pkg, msg)]
+
+	def register(self, topic, msg_class, frame_id, callback):
+		"""
+		Calls callback with the messages of the topic with the given frame_id
+		@ topic str: topic name
+		@ msg_class class: message class
+		@ frame_id str: frame_id of the messages
+		@ callback function: called with each message
+		"""
+		key = (topic, msg_class)
+
+		# Locks the resource
+		self.__lock.acquire()
+		# Routes are replaced instead of modified, callbacks read them without locking
+		routes = dict(self.__routes.get(key, dict()))
+		routes[frame_id] = routes.get(frame_id, tuple()) + (callback,)
+		self.__routes[key] = routes
+
+		if not key in self.__subscribers:
+			self.__subscribers[key] = Subscriber(topic, msg_class, self.__dispatch, key)
+		# Releases the resource
+		self.__lock.release()
+
+	def unregister(self, topic, msg_class, frame_id, callback):
+		"""
+		Stops calling a registered callback. The topic is unsubscribed when it has no callbacks left
+		"""
+		key = (topic, msg_class)
+
+		# Locks the resource
+		self.__lock.acquire()
+		routes = dict(self.__routes.get(key, dict()))
+		callbacks = tuple([cb for cb in routes.get(frame_id, tuple()) if cb != callback])
+
+		if bool(callbacks):
+			routes[frame_id] = callbacks
+		else:
+			routes.pop(frame_id, None)
+
+		if bool(routes):
+			self.__routes[key] = routes
+		else:
+			self.__routes.pop(key, None)
+			if key in self.__subscribers:
+				self.__subscribers.pop(key).unregister()
+		# Releases the resource
+		self.__lock.release()
+
+	def __dispatch(self, msg, key):
+		"""
+		Subscriber callback. Hands the message to the callbacks of its frame_id
+		@ msg object: received message
+		@ key tuple: topic and message class of the subscriber
+		"""
+		for callback in self.__routes.get(key, dict()).get(msg.header.frame_id, tuple()):
+			callback(msg)
+
+router = PerceptionRouter() # Shared by every Agent and Stimulus
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Condition, current_thread
+from motivational_model.classes.engine import engine
+
+class EvolutionScheduler():
+	"""
+	Evolution Scheduler Class
+	Advances every registered Temporal Evolution from a single thread
+	"""
+	def __init__(self, engine):
+
+		self.__engine = engine # Stores every evolution row
+		self.__engine.set_wake_callback(self.__wake)
+
+		# Wakeup counters
+		self.__wakeups = 0 # Loop iterations that ticked the engine
+		self.__idle_wakeups = 0 # Loop iterations that advanced no row
+
+		self.__stop = False
+		self.__thread = None
+		self.__condition = Condition()
+
+	def register(self, row):
+		"""
+		Registers an evolution row. Its first step is done immediately
+		@ row int: engine row of the evolution
+		"""
+		# Locks the resource
+		self.__condition.acquire()
+		self.__engine.register(row, self.__now())
+
+		# Starts the scheduler thread with the first evolution. Simulated time is driven by sleep()
+		if not self.__is_simulated() and (self.__thread is None or not self.__thread.is_alive()):
+			self.__stop = False
+			self.__thread = Thread(target=self.__run)
+			self.__thread.daemon = True
+			self.__thread.start()
+
+		self.__condition.notify()
+		# Releases the resource
+		self.__condition.release()
+
+	def unregister(self, row):
+		"""
+		Unregisters an evolution row. Waits until its current step finishes
+		@ row int: engine row of the evolution
+		"""
+		self.__engine.unregister(row)
+		self.__wake()
+
+	def is_registered(self, row):
+		"""
+		Returns True if the evolution row is driven by the scheduler
+		"""
+		return self.__engine.is_registered(row)
+
+	def get_stats(self):
+		"""
+		Returns scheduler wakeup counters
+		@ returns dict: wakeups, idle wakeups and idle rows polled
+		"""
+		return {"wakeups": self.__wakeups, "idle_wakeups": self.__idle_wakeups, "idle_polls": self.__engine.get_idle_polls()}
+
+	def sleep(self, duration):
+		"""
+		Sleeps the given number of seconds while evolutions advance
+		@ duration float: seconds
+		"""
+		self.sleep_until(self.__now() + duration)
+
+	def sleep_until(self, instant):
+		"""
+		Sleeps until the given instant while evolutions advance
+		With a simulated clock every evolution due in that period is advanced at its due time
+		@ instant float: time in seconds
+		"""
+		clock = self.__engine.get_clock()
+
+		if not clock.is_simulated():
+			clock.advance_to(instant)
+			return
+
+		self.run_until(instant)
+
+	def run_until(self, instant):
+		"""
+		Advances the simulated clock to the given instant ticking every due evolution in order
+		@ instant float: time in seconds
+		"""
+		clock = self.__engine.get_clock()
+		next_due = self.__engine.get_next_due()
+
+		while next_due <= instant:
+			clock.advance_to(next_due)
+			self.__wakeups += 1
+			if not self.__engine.tick(next_due):
+				self.__idle_wakeups += 1
+			next_due = self.__engine.get_next_due()
+
+		clock.advance_to(instant)
+
+	def __now(self):
+		"""
+		Returns current time of the engine clock
+		"""
+		return self.__engine.get_clock().now()
+
+	def __is_simulated(self):
+		"""
+		Returns True if the engine clock is simulated
+		"""
+		return self.__engine.get_clock().is_simulated()
+
+	def __wake(self):
+		"""
+		Signals the scheduler loop to recompute the next due time
+		"""
+		# Locks the resource
+		self.__condition.acquire()
+		self.__condition.notify()
+		# Releases the resource
+		self.__condition.release()
+
+	def stop(self):
+		"""
+		Stops the scheduler thread
+		"""
+		# Locks the resource
+		self.__condition.acquire()
+		self.__stop = True
+		self.__condition.notify()
+		# Releases the resource
+		self.__condition.release()
+
+		if self.__thread is not None and self.__thread is not current_thread():
+			self.__thread.join()
+
+	def __run(self):
+		"""
+		Scheduler loop. Waits for the next due evolution and advances every due row
+		Non evolving rows are parked and cost nothing until they are woken up
+		"""
+		while True:
+			# Locks the resource
+			self.__condition.acquire()
+
+			# Waits until the first evolution is due
+			next_due = self.__engine.get_next_due()
+			while not self.__stop and next_due > self.__now():
+				if next_due == float("inf"):
+					self.__condition.wait()
+				else:
+					self.__condition.wait(next_due - self.__now())
+				next_due = self.__engine.get_next_due()
+
+			if self.__stop:
+				# Releases the resource
+				self.__condition.release()
+				return
+
+			# Releases the resource
+			self.__condition.release()
+
+			self.__wakeups += 1
+			if not self.__engine.tick(self.__now()):
+				self.__idle_wakeups += 1
+
+scheduler = EvolutionScheduler(engine) # Shared by every Temporal Evolution
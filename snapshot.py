@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from motivational_model.classes.engine import engine
+
+class Snapshot():
+	"""
+	Snapshot Class
+	Frozen reading of every evolution taken once per model tick
+	"""
+	def __init__(self, engine):
+
+		self.__engine = engine # Stores every evolution row
+
+		self.__tick = None # Current tick number, None until the first snapshot
+		self.__values = None # Evolution values at the start of the tick
+		self.__evolving = None # Evolution evolving flags at the start of the tick
+		self.__dirty_rows = list() # Evolution rows changed since the previous tick
+		self.__group_sum = None # Sum of the evolving rows of every group at the start of the tick
+		self.__group_count = None # Evolving rows of every group at the start of the tick
+
+	def take(self):
+		"""
+		Reads every evolution and starts a new tick
+		Values computed against the previous snapshot become stale
+		"""
+		self.__values, self.__evolving, self.__dirty_rows, self.__group_sum, self.__group_count = self.__engine.snapshot()
+
+		if self.__tick is None:
+			self.__tick = 0
+		else:
+			self.__tick += 1
+
+	def get_tick(self):
+		"""
+		Returns current tick number. None if no snapshot has been taken
+		"""
+		return self.__tick
+
+	def get_dirty_rows(self):
+		"""
+		Returns the evolution rows changed since the previous tick
+		"""
+		return self.__dirty_rows
+
+	def get_value(self, evol):
+		"""
+		Returns the evolution value at the start of the tick
+		Evolutions created after the snapshot are read directly
+		@ evol TemporalEvolution: evolution object
+		"""
+		row = evol.get_row()
+
+		if self.__values is None or row >= len(self.__values):
+			return evol.get_value()
+
+		return float(self.__values[row])
+
+	def is_evolving(self, evol):
+		"""
+		Returns the evolution evolving flag at the start of the tick
+		@ evol TemporalEvolution: evolution object
+		"""
+		row = evol.get_row()
+
+		if self.__evolving is None or row >= len(self.__evolving):
+			return evol.is_evolving()
+
+		return bool(self.__evolving[row])
+
+	def get_group(self, group):
+		"""
+		Returns the sum of the evolving rows of a group at the start of the tick
+		Groups created after the snapshot are read directly
+		@ group int: group index
+		@ returns tuple: sum of the values and number of evolving rows
+		"""
+		if self.__group_sum is None or group >= len(self.__group_sum):
+			return self.__engine.get_group(group)
+
+		return float(self.__group_sum[group]), int(self.__group_count[group])
+
+snapshot = Snapshot(engine) # Shared by every model entity
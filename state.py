@@ -2,21 +2,27 @@
 # -*- coding: utf-8 -*-
 
 from motivational_model.classes.temporalevolution import TemporalEvolution
+from motivational_model.classes.snapshot import snapshot
 from motivational_model.logger.log import Logger
 
 class State(Logger):
 	"""
 	State Class
+	The value follows the activation or the deactivation parameters from the last switch.
+	It is computed on demand from the value at the switch and the time since then
 	"""
 	def __init__(self, id, name, related_ag, related_sti, params_act, params_deact, time_step=1.0, logging=False):
 
 		self.__id = id
 		self.__name = name
 		self.__value = -1
+		self.__tick = None # Snapshot tick of the value
 
 		# Evolution Parameters
 		self.__params_act = params_act
 		self.__params_deact = params_deact
+		self.__active = False # Activation parameters in use
+		self.__stopped = False
 
 		# Related agent or stimuli
 		self.__related_ag = related_ag
@@ -26,12 +32,10 @@ class State(Logger):
 		self.__logging = logging
 		Logger.__init__(self, "Experiment", "States") # Creates Log file
 
-		# Creates Agent/Stimulus Temporal Evolution objects
-		self.__activation = TemporalEvolution(id, name +"_activation", 0, 100, 100, 0, 0, params_act, False, time_step)
-		self.__activation.start() # Starts the thread
-
-		self.__deactivation = TemporalEvolution(id, name +"_deactivation", 0, 100, 100, 0, 0, params_deact, False, time_step)
-		self.__deactivation.start() # Starts the thread
+		# Creates the State Temporal Evolution. The engine anchors it at every switch and clamps it to [0, 100]
+		self.__evolution = TemporalEvolution(id, name, 0, 100, 100, 0, 0, params_deact, False, time_step, True)
+		self.__evolution.set_owner(self) # Changes mark the State dirty
+		self.__evolution.start() # Registers the evolution in the scheduler
 
 	def get_id(self):
 		"""
@@ -61,57 +65,102 @@ class State(Logger):
 		"""
 		Returns Activation Parameters
 		"""
-		return self.__params_std
+		return self.__params_act
 
 	def get_params_deact(self):
 		"""
 		Returns Deactivation Parameters
 		"""
-		return self.__params_destd
+		return self.__params_deact
+
+	def set_params(self, params_act, params_deact):
+		"""
+		Sets new Activation and Deactivation Parameters keeping the current value
+		@ params_act dict: activation te_id, slope, tau and step
+		@ params_deact dict: deactivation te_id, slope, tau and step
+		"""
+		self.__params_act = params_act
+		self.__params_deact = params_deact
+		self.__switch(self.__active)
+
+	def get_evolution(self):
+		"""
+		Returns State Temporal Evolution object
+		"""
+		return self.__evolution
 
 	def get_activation(self):
 		"""
 		Returns State Activation object
+		Activation and deactivation share the State Temporal Evolution
 		"""
-		return self.__activation
+		return self.__evolution
 
 	def get_deactivation(self):
 		"""
 		Returns State Deactivation object
+		Activation and deactivation share the State Temporal Evolution
+		"""
+		return self.__evolution
+
+	def is_active(self):
+		"""
+		Returns True if the State follows the activation parameters
 		"""
-		return self.__deactivation
+		return self.__active
+
+	def set_phase(self, active):
+		"""
+		Selects the activation or deactivation parameters without changing the value
+		@ active bool: activation parameters
+		"""
+		self.__active = active
+		self.__evolution.set_params(self.__params_act if active else self.__params_deact)
 
 	def set_state_evolution(self, active):
 		"""
 		Sets Evolving Value for State Evolutions
+		The evolution continues from its current value with the new parameters
+		"""
+		if self.__stopped or (active == self.__active and self.__evolution.is_evolving()):
+			return
+
+		self.__switch(active)
+		self.__evolution.set_evolving_value(True)
+
+	def stop(self):
 		"""
-		if active:
-			self.__activation.set_value(self.__deactivation.get_value())
-			self.__activation.set_evolving_value(True)
-			self.__deactivation.set_evolving_value(False)
-		else:
-			self.__deactivation.set_value(self.__activation.get_value())
-			self.__activation.set_evolving_value(False)
-			self.__deactivation.set_evolving_value(True)
+		Stops evolution. The State is not switched again
+		"""
+		self.__stopped = True
+		self.__evolution.stop()
+
+	def __switch(self, active):
+		"""
+		Anchors the evolution at its current value with the new parameters
+		@ active bool: activation parameters
+		"""
+		value = self.__evolution.get_value()
+		self.set_phase(active)
+		# Exponential and logarithmic curves continue from the point with that value
+		self.__evolution.set_value(value)
 
 	def get_value(self):
 		"""
 		Returns External Stimuli Deficit value
+		Computed once per snapshot tick against the frozen evolution values
 		"""
-		value = 0
+		tick = snapshot.get_tick()
+		if tick is not None and tick == self.__tick:
+			return self.__value
 
-		if self.__activation.is_evolving():
-			value = self.__activation.get_value()
-		else:
-			value = self.__deactivation.get_value()
-			
-		if value > 100:
-			value = 100			
-		elif value < 0:
-			value = 0
+		value = snapshot.get_value(self.__evolution)
 
 		if self.__logging and value != self.__value:
 
 			Logger.write_file(self, self.__name, value) # Writes State name and value
+
+		self.__value = value
+		self.__tick = tick
 			
 		return value
\ No newline at end of file
@@ -1,8 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from rospy import Subscriber
-from handlers.functions import my_import
+from motivational_model.classes.perception import perception
+from motivational_model.classes.router import router
 
 class Stimulus():
 	"""
@@ -14,16 +14,19 @@ class Stimulus():
 		self.__name = name
 
 		self.__current_state = current_state
+		self.__subscribed = False
 		
 		if bool(topic) and bool(msg) and bool(pkg):
 			self.__topic = topic
-			self.__msg = my_import(pkg+".msg", msg)
+			self.__msg = router.get_msg_class(pkg, msg)
 			self.__pkg = pkg
 
-			# Subscriber
-			self.__subs = Subscriber(self.__topic, self.__msg, self.__perception_cb)
+			# Messages of the topic with the Stimulus name as frame_id
+			router.register(self.__topic, self.__msg, self.__name, self.__perception_cb)
+			self.__subscribed = True
 
 		self.__states = states # Stores related States
+		self.__state_index = {sta.get_name(): sta for sta in states} # State name -> State object
 
 		# Activates current state
 		if bool(self.__current_state):
@@ -43,15 +46,22 @@ class Stimulus():
 
 	def set_stimulus_state(self, state):
 		"""
-		Sets current State
-		@ state State: current state
+		Sets current State. Only the previous and the new State change
+		@ state str: current state name
 		"""
-		for sta in self.__states:
-			if sta.get_name() == state:
-				self.__current_state = sta
-				self.__current_state.set_state_evolution(True)
-			else:
-				sta.set_state_evolution(False)
+		new_state = self.__state_index.get(state)
+
+		# Repeated reports of the current state are ignored
+		if new_state is self.__current_state:
+			return
+
+		if bool(self.__current_state):
+			self.__current_state.set_state_evolution(False)
+
+		self.__current_state = new_state
+
+		if bool(self.__current_state):
+			self.__current_state.set_state_evolution(True)
 
 	def get_current_state(self):
 		"""
@@ -65,19 +75,50 @@ class Stimulus():
 		"""
 		return self.__states
 
+	def set_states(self, states, current_state):
+		"""
+		Replaces the State list
+		@ states list: State objects
+		@ current_state State: current state, activated if it changes. The replaced one is switched off
+		"""
+		self.__states = states
+		self.__state_index = {sta.get_name(): sta for sta in states}
+
+		if current_state is not self.__current_state:
+			if bool(self.__current_state):
+				self.__current_state.set_state_evolution(False)
+
+			self.__current_state = current_state
+
+			if bool(self.__current_state):
+				self.__current_state.set_state_evolution(True)
+
+	def stop(self):
+		"""
+		Stops receiving perception messages
+		"""
+		if self.__subscribed:
+			router.unregister(self.__topic, self.__msg, self.__name, self.__perception_cb)
+			self.__subscribed = False
+
 	def add_sta(self, var):
 		"""
 		Adds State objects to the list
 		@ var State: State object
 		"""
 		self.__states.append(var)
+		self.__state_index[var.get_name()] = var
 
 	def __perception_cb(self, msg):
 		"""
 		Callback Method receives Stimulus information
+		Receives only the messages with the Stimulus name as frame_id
+		The latest state is applied on the next model tick
 		"""
-		if msg.header.frame_id == self.__name:
-			values = {pair.key: pair.value for pair in msg.values}
-			
-			if "state" in values.keys(): # Gets State
-				self.set_stimulus_state(values["state"])
\ No newline at end of file
+		state = None
+		for pair in msg.values:
+			if pair.key == "state": # Gets state
+				state = pair.value
+
+		if state is not None:
+			perception.report(self, state, self.set_stimulus_state)
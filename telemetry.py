@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+DOMINANCE = "dominance" # Dominant motivation changes, value is (previous, current)
+FEEDBACK = "feedback" # Action feedback, value is (action, status)
+
+SCHEMA = [
+	"CREATE TABLE IF NOT EXISTS variable_values (time REAL, kind TEXT, variable TEXT, value REAL)",
+	"CREATE INDEX IF NOT EXISTS variable_values_idx ON variable_values (variable, time)",
+	"CREATE TABLE IF NOT EXISTS dominance (time REAL, previous TEXT, current TEXT)",
+	"CREATE INDEX IF NOT EXISTS dominance_idx ON dominance (time)",
+	"CREATE TABLE IF NOT EXISTS feedback (time REAL, action TEXT, status INTEGER)",
+	"CREATE INDEX IF NOT EXISTS feedback_idx ON feedback (action, time)"]
+
+class TelemetryDatabase():
+	"""
+	Telemetry Database Class
+	SQLite database in WAL mode written in batches by the log writer thread
+	"""
+	def __init__(self, db_file):
+
+		self.__db_file = db_file
+		self.__conn = None # Created by the writer thread that uses it
+
+	def __connect(self):
+		"""
+		Opens the database and creates the tables
+		"""
+		self.__conn = sqlite3.connect(self.__db_file)
+		self.__conn.execute("PRAGMA journal_mode=WAL")
+		self.__conn.execute("PRAGMA synchronous=NORMAL")
+
+		for statement in SCHEMA:
+			self.__conn.execute(statement)
+		self.__conn.commit()
+
+	def insert(self, kind, records):
+		"""
+		Inserts a batch of records in the current transaction
+		@ kind str: class of the values, DOMINANCE or FEEDBACK
+		@ records list: (key, timestamp, value) tuples
+		"""
+		if self.__conn is None:
+			self.__connect()
+
+		if kind == DOMINANCE:
+			self.__conn.executemany("INSERT INTO dominance VALUES (?, ?, ?)", [(stamp, value[0], value[1]) for key, stamp, value in records])
+		elif kind == FEEDBACK:
+			self.__conn.executemany("INSERT INTO feedback VALUES (?, ?, ?)", [(stamp, value[0], value[1]) for key, stamp, value in records])
+		else:
+			self.__conn.executemany("INSERT INTO variable_values VALUES (?, ?, ?, ?)", [(stamp, kind, str(key), value) for key, stamp, value in records])
+
+	def commit(self):
+		"""
+		Commits the current transaction
+		"""
+		if self.__conn is not None:
+			self.__conn.commit()
+
+	def close(self):
+		"""
+		Commits and closes the database
+		"""
+		if self.__conn is not None:
+			self.__conn.commit()
+			self.__conn.close()
+			self.__conn = None
+
+class TelemetrySink():
+	"""
+	Telemetry Sink Class
+	Writes the records of one kind into the telemetry database
+	"""
+	def __init__(self, database, kind):
+
+		self.__database = database
+		self.__kind = kind
+
+	def write(self, records):
+		"""
+		Inserts records into the database
+		@ records list: (key, timestamp, value) tuples
+		"""
+		self.__database.insert(self.__kind, records)
+
+	def flush(self):
+		"""
+		Commits the inserted records
+		"""
+		self.__database.commit()
+
+	def close(self):
+		"""
+		Closes the database
+		"""
+		self.__database.close()
@@ -1,46 +1,50 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from rospy import Publisher, loginfo, logwarn, logerr, sleep
-from math import exp, log
+from rospy import Publisher, loginfo, logwarn, logerr
 from std_msgs.msg import Float32
-from threading import Thread, Lock
+from motivational_model.classes.engine import engine, CONSTANT, STEP
+from motivational_model.classes.scheduler import scheduler
 
-class TemporalEvolution(Thread):
+class TemporalEvolution():
 	"""
 	Temporal Evolution Class
+	View onto one row of the evolution engine
 	"""
-	def __init__(self, id, name, initial_value, ideal_value, upper_limit, lower_limit, satisfaction_time, params_std, evolving, time_step=1.0):
-		
+	def __init__(self, id, name, initial_value, ideal_value, upper_limit, lower_limit, satisfaction_time, params_std, evolving, time_step=1.0, lazy=False):
+
 		self.__name = name
 		self.__id = id
 
 		# Evolution Parameters
 		self.__initial_value = initial_value
-		self.__current_value = initial_value
 		self.__ideal_value = ideal_value
 		self.__upper_limit = upper_limit
 		self.__lower_limit = lower_limit
 		self.__satisfaction_time = satisfaction_time
 		self.__params_std = params_std
 		self.__time_step = time_step
+		self.__lazy = lazy # Value computed on demand from its closed form
 
 		# Initializes Evolution
-		self.__evolving = evolving
-		self.__evol_params = params_std
-		self.__punctual = False
 		self.__stop = False
-		self.__no_saturation = 0.1 # Prevents saturation 
 
 		# Publisher
 		self.__pub = Publisher(name.lower() + "/value", Float32, latch=True, queue_size=1)
 
+		# Creates the evolution row
+		self.__row = engine.add(initial_value, upper_limit, lower_limit, satisfaction_time, dict(params_std, te_id=CONSTANT), evolving, time_step, lazy)
+
 		# Defines evolving method
-		self.__std_evol = self.set_evolution(params_std["te_id"])
+		self.__valid = self.set_evolution(params_std["te_id"])
 
-		# Creates thread and lock
-		Thread.__init__(self, target=self.__std_evol)
-		self.__lock = Lock()
+	def start(self):
+		"""
+		Registers the temporal evolution in the scheduler
+		"""
+		if self.__valid:
+			self.__stop = False
+			scheduler.register(self.__row)
 
 	def stop(self):
 		"""
@@ -50,227 +54,140 @@ class TemporalEvolution(Thread):
 		self.set_evolving_value(False)
 		# Sets stop to true
 		self.__stop = True
-		#Thread.__stop()
-		Thread.join(self)
+		# Waits until the current step finishes
+		scheduler.unregister(self.__row)
 
 	def get_id(self):
 		"""
 		Gets evolving variable id
 		"""
 		return self.__id
-		
+
+	def is_lazy(self):
+		"""
+		Returns True if the value is computed on demand
+		"""
+		return self.__lazy
+
+	def get_row(self):
+		"""
+		Returns the engine row of the evolution
+		"""
+		return self.__row
+
+	def set_owner(self, owner):
+		"""
+		Sets the entity whose value depends on the evolution
+		@ owner object: Homeostatic Variable or State object
+		"""
+		engine.set_owner(self.__row, owner)
+
+	def set_group(self, group):
+		"""
+		Adds the evolution to a group of evolutions added up together
+		@ group int: engine group index
+		"""
+		engine.set_group(self.__row, group)
+
 	def set_evolving_value(self, evolving_value):
 		"""
 		Sets Temporal Evolution evolving value
 		"""
-		# Locks the resource
-		self.__lock.acquire()
-		self.__evolving = evolving_value
-		# Releases the resource
-		self.__lock.release()
+		engine.set_evolving(self.__row, evolving_value)
 
 	def is_evolving(self):
 		"""
 		Returns True if the variable is evolving
 		"""
-		# Locks the resource
-		self.__lock.acquire()
-		aux =  self.__evolving
-		# Releases the resource
-		self.__lock.release()
-
-		return aux
+		return engine.is_evolving(self.__row)
 
 	def set_value(self, current_value):
 		"""
 		Sets current value
 		@ current_value float: value to be set
 		"""
-		# Locks the resource
-		self.__lock.acquire()
-		self.__current_value = current_value
-		# Releases the resource
-		self.__lock.release()
+		engine.set_value(self.__row, current_value)
 
 	def get_value(self):
 		"""
 		Returns current Value
 		"""
-		# Locks the resource
-		self.__lock.acquire()
-		value = self.__current_value
-		# Releases the resource
-		self.__lock.release()
-
-		return value
+		return engine.get_value(self.__row)
 
 	def set_fn_time(self, actual_value):
 		"""
 		Sets time value for the exponential and logarithmic functions
-		""" 
-		self.__fn_time = actual_value
+		"""
+		engine.set_fn_time(self.__row, actual_value)
 
 	def get_fn_time(self):
 		"""
 		Returns time value for the exponential and logarithmic functions
 		"""
-		return self.__fn_time
+		return engine.get_fn_time(self.__row)
 
 	def get_deficit(self):
 		"""
 		Returns Deficit Value of the evolution
 		"""
-		# Locks the resource
-		self.__lock.acquire()
-		value = self.__ideal_value - self.__actual_value
-		# Releases the resource
-		self.__lock.release()
-
-		return value
+		return self.__ideal_value - self.get_value()
 
 	def is_punctual(self):
 		"""
 		Returns True if the Effect is Punctual
 		"""
-		return self.__punctual
+		return engine.get_te_id(self.__row) == STEP
 
 	def set_evolution(self, te_id):
 		"""
 		Sets the evolution method for the object
 		@ te_id int: evolution id
+		0 = constant, 1 = linear, 2 = exponential, 3 = logarithmic, 4 = step
 		"""
-		if te_id == 0:
-			return self.constant_evolution
-		elif te_id == 1:
-			return self.linear_evolution
-		elif te_id == 2:
-			return self.exp_evolution
-		elif te_id == 3:
-			return self.log_evolution
-		elif te_id == 4:
-			return self.step_evolution
+		if te_id in range(5):
+			engine.set_params(self.__row, {"te_id": te_id})
+			return True
 		else:
 			logerr("Params given are not correct")
+			return False
 
-	def constant_evolution(self):
-		"""
-		Variable evolves as a constant function
-		"""
-		self.set_value(self.__actual_value)
-		new_value = self.get_value()
-
-		while self.is_evolving() or not self.__stop:
-			if self.is_evolving():
-				new_value = self.get_value()
-
-				if new_value > self.__upper_limit:
-					new_value = self.__upper_limit
-
-				elif new_value < self.__lower_limit:
-					new_value = self.__lower_limit
-
-				self.set_value(new_value)
-				sleep(self.__time_step)
-			else:
-				sleep(self.__no_saturation)
-
-	def linear_evolution(self):
+	def reuse(self, id, name, initial_value, params_std):
 		"""
-		Variable evolves as a linear function
+		Restarts a stopped evolution for another variable with the same limits
+		@ id int: variable id
+		@ name str: variable name
+		@ initial_value float: starting value
+		@ params_std dict: te_id, slope, tau and step
 		"""
-		self.set_value(self.__actual_value)
-
-		while self.is_evolving() or not self.__stop:
-			new_value = self.get_value()
-			if self.is_evolving():
-				new_value += self.__evol_params["slope"]
-				if new_value > self.__upper_limit:
-					new_value = self.__upper_limit
-					self.set_value(new_value)
-					sleep(self.__satisfaction_time)
-
-				elif new_value < self.__lower_limit:
-					new_value = self.__lower_limit
-
-				self.set_value(new_value)
-				sleep(self.__time_step)
-			else:
-				sleep(self.__no_saturation)
-	
-	def exp_evolution(self):
-		"""
-		Variable evolves as an exponential function
-		"""
-		new_value = self.get_value()
-		self.set_fn_time(self.__actual_value)
-		fntime = self.get_fn_time()
-
-		while self.is_evolving() or not self.__stop:
-			if self.is_evolving():
-				fntime += 1
-				new_value = exp(fntime/self.__evol_params["tau"])
-				
-				if new_value > self.__upper_limit:
-					new_value = self.__upper_limit
-					sleep(self.__satisfaction_time)
-
-				elif new_value < self.__lower_limit:
-					new_value = self.__lower_limit
+		self.__id = id
+		self.__name = name
+		self.__initial_value = initial_value
 
-				self.set_value(new_value)
-				sleep(self.__time_step)
-			else:
-				sleep(self.__no_saturation)
+		self.__valid = self.set_params(params_std)
+		self.set_value(initial_value)
+		self.set_fn_time(initial_value)
+		self.set_evolving_value(True)
+		self.start()
 
-	def log_evolution(self):
+	def resume(self, evolution):
 		"""
-		Variable evolves as a logarithmic function
+		Continues from the current point of the evolution it replaces
+		@ evolution TemporalEvolution: replaced evolution, not stopped yet
 		"""
-		new_value = self.get_value()
-		self.set_fn_time(self.__actual_value)
-		fntime = self.get_fn_time()
-
-		while self.is_evolving() or not self.__stop:
-			if self.is_evolving():
-				fntime += 1
-				new_value = log(fntime)
-				
-				if new_value > self.__upper_limit:
-					new_value = self.__upper_limit
-					sleep(self.__satisfaction_time)
-
-				elif new_value < self.__lower_limit:
-					new_value = self.__lower_limit
-
-				self.set_value(new_value)
-				sleep(self.__time_step)
-			else:
-				sleep(self.__no_saturation)
+		engine.copy_row(self.__row, evolution.get_row())
 
-	def step_evolution(self):
+	def set_params(self, params_std):
 		"""
-		Variable evolves as a step function
+		Sets new evolution parameters keeping the current value
+		@ params_std dict: te_id, slope, tau and step
 		"""
-		self.__punctual = True
-		self.set_value(self.__actual_value)
-		new_value = self.get_value()
-
-		while self.is_evolving() or not self.__stop:
-			if self.is_evolving():
-				new_value += self.__evol_params["step"]
-				
-				if new_value > self.__upper_limit:
-					new_value = self.__upper_limit
-					sleep(self.__satisfaction_time)
-
-				elif new_value < self.__lower_limit:
-					new_value = self.__lower_limit
-
-				self.set_value(new_value)
-				sleep(self.__time_step)
-				self.set_evolving_value(False)
-			else:
-				sleep(self.__no_saturation)
+		if params_std["te_id"] in range(5):
+			self.__params_std = params_std
+			engine.set_params(self.__row, params_std)
+			return True
+		else:
+			logerr("Params given are not correct")
+			return False
 
 	def __set_time_step(self, time):
 		"""
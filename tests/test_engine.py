@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Evolution Engine tests
+Run with pytest. Only numpy is needed, rospy is replaced by an empty module
+"""
+
+import os
+import sys
+import types
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules live at the repository root and are imported as motivational_model.classes
+if not "rospy" in sys.modules:
+	rospy = types.ModuleType("rospy")
+	rospy.sleep = lambda duration: None
+	sys.modules["rospy"] = rospy
+
+if not "motivational_model" in sys.modules:
+	package = types.ModuleType("motivational_model")
+	package.__path__ = [ROOT]
+	sys.modules["motivational_model"] = package
+	classes = types.ModuleType("motivational_model.classes")
+	classes.__path__ = [ROOT]
+	sys.modules["motivational_model.classes"] = classes
+
+from motivational_model.classes.clock import SimulatedClock
+from motivational_model.classes.engine import EvolutionEngine, CONSTANT, LINEAR, EXPONENTIAL, LOGARITHMIC, STEP
+
+TIME_STEP = 1.0
+STEPS = 50
+
+def params(te_id, slope=1.0, tau=1.0, step=1.0):
+	"""
+	Returns evolution parameters as read from the database
+	"""
+	return {"te_id": te_id, "slope": slope, "tau": tau, "step": step}
+
+def new_engine():
+	"""
+	Returns an empty engine driven by a simulated clock
+	"""
+	engine = EvolutionEngine()
+	engine.set_clock(SimulatedClock())
+	return engine
+
+def start(engine, initial_value, params_std, upper_limit=1e300, lower_limit=-1e300, satisfaction_time=0.0, fn_time=None):
+	"""
+	Adds and registers an evolving row
+	@ fn_time float: fn_time set after registering, the initial value if None
+	@ returns int: row index
+	"""
+	row = engine.add(initial_value, upper_limit, lower_limit, satisfaction_time, params_std, True, TIME_STEP)
+	engine.register(row, engine.get_clock().now())
+	if fn_time is not None:
+		engine.set_fn_time(row, fn_time)
+	return row
+
+def step(engine):
+	"""
+	Runs the tick due now and advances the clock one time step
+	"""
+	clock = engine.get_clock()
+	engine.tick(clock.now())
+	clock.advance_to(clock.now() + TIME_STEP)
+
+@pytest.mark.parametrize("tau", [0.5, 3.0, 17.0, 250.0])
+@pytest.mark.parametrize("fn_time", [0.0, 1.0, 7.0, 2.5, 30.3, 5000.0, 5000.75])
+def test_exponential(tau, fn_time):
+	engine = new_engine()
+	row = start(engine, 0.0, params(EXPONENTIAL, tau=tau), fn_time=fn_time)
+
+	for k in range(1, STEPS + 1):
+		step(engine)
+		assert engine.get_fn_time(row) == fn_time + k
+		expected = np.exp((fn_time + k)/tau) if (fn_time + k)/tau < 700 else np.inf
+		np.testing.assert_allclose(engine.get_value(row), min(expected, 1e300), rtol=1e-12)
+
+@pytest.mark.parametrize("fn_time", [1.0, 7.0, 2.5, 30.3, 4095.0, 4096.0, 5000.0, 5000.75, 123456.5])
+def test_logarithmic(fn_time):
+	engine = new_engine()
+	row = start(engine, 0.0, params(LOGARITHMIC), fn_time=fn_time)
+
+	for k in range(1, STEPS + 1):
+		step(engine)
+		assert engine.get_fn_time(row) == fn_time + k
+		np.testing.assert_allclose(engine.get_value(row), np.log(fn_time + k), rtol=1e-12)
+
+def test_fn_time_from_initial_value():
+	engine = new_engine()
+	exp_row = start(engine, 2.5, params(EXPONENTIAL, tau=4.0))
+	log_row = start(engine, 4100.0, params(LOGARITHMIC))
+
+	for k in range(1, STEPS + 1):
+		step(engine)
+		np.testing.assert_allclose(engine.get_value(exp_row), np.exp((2.5 + k)/4.0), rtol=1e-12)
+		np.testing.assert_allclose(engine.get_value(log_row), np.log(4100.0 + k), rtol=1e-12)
+
+def test_set_fn_time_while_stepping():
+	engine = new_engine()
+	exp_row = start(engine, 1.0, params(EXPONENTIAL, tau=3.0))
+	log_row = start(engine, 1.0, params(LOGARITHMIC))
+
+	for k in range(10):
+		step(engine)
+
+	engine.set_fn_time(exp_row, 6.25)
+	engine.set_fn_time(log_row, 6000.25)
+
+	for k in range(1, STEPS + 1):
+		step(engine)
+		np.testing.assert_allclose(engine.get_value(exp_row), np.exp((6.25 + k)/3.0), rtol=1e-12)
+		np.testing.assert_allclose(engine.get_value(log_row), np.log(6000.25 + k), rtol=1e-12)
+
+def test_upper_limit_clamps_value():
+	engine = new_engine()
+	row = start(engine, 0.0, params(EXPONENTIAL, tau=1.0), upper_limit=100.0)
+
+	values = list()
+	for k in range(1, 10):
+		step(engine)
+		values.append(engine.get_value(row))
+
+	np.testing.assert_allclose(values[:4], np.exp(np.arange(1, 5)), rtol=1e-12)
+	assert values[4:] == [100.0]*5
+
+def test_lower_limit_clamps_value():
+	engine = new_engine()
+	log_row = start(engine, 0.0, params(LOGARITHMIC), lower_limit=0.0, fn_time=-0.5)
+	linear_row = start(engine, 5.0, params(LINEAR, slope=-2.0), lower_limit=0.0)
+
+	step(engine)
+	assert engine.get_value(log_row) == 0.0
+	assert engine.get_value(linear_row) == 3.0
+
+	step(engine)
+	np.testing.assert_allclose(engine.get_value(log_row), np.log(1.5), rtol=1e-12)
+	assert engine.get_value(linear_row) == 1.0
+
+	step(engine)
+	assert engine.get_value(linear_row) == 0.0
+
+def test_satisfaction_time_holds_value():
+	engine = new_engine()
+	row = start(engine, 0.0, params(LINEAR, slope=40.0), upper_limit=100.0, satisfaction_time=5.0)
+	clock = engine.get_clock()
+
+	# 40, 80 and 100 after clamping at t = 0, 1 and 2
+	for k in range(3):
+		step(engine)
+	assert engine.get_value(row) == 100.0
+
+	# The next step is delayed the time step plus the satisfaction time
+	assert engine.get_next_due() == 2.0 + TIME_STEP + 5.0
+	while clock.now() < engine.get_next_due():
+		assert engine.tick(clock.now()) == 0
+		clock.advance_to(clock.now() + TIME_STEP)
+	assert engine.tick(clock.now()) == 1
+
+def test_constant_is_not_held():
+	engine = new_engine()
+	row = start(engine, 150.0, params(CONSTANT), upper_limit=100.0, satisfaction_time=5.0)
+
+	step(engine)
+	assert engine.get_value(row) == 100.0
+	assert engine.get_next_due() == TIME_STEP
+
+@pytest.mark.parametrize("params_std", [params(LINEAR, slope=3.0), params(EXPONENTIAL, tau=20.0), params(LOGARITHMIC), params(STEP, step=5.0)])
+def test_lazy_snapshot_matches_stepped_rows(params_std):
+	engine = new_engine()
+	stepped = engine.add(2.0, 100.0, 0.0, 0.0, params_std, True, TIME_STEP)
+	lazy = engine.add(2.0, 100.0, 0.0, 0.0, params_std, True, TIME_STEP, True)
+	engine.register(stepped, 0.0)
+	engine.register(lazy, 0.0)
+
+	for k in range(1, STEPS + 1):
+		step(engine)
+		value = engine.snapshot()[0]
+		# The stepped row applied k steps, the lazy row is evaluated k time steps after its anchor
+		np.testing.assert_allclose(value[lazy], value[stepped], rtol=1e-12)
+		assert value[lazy] == engine.get_value(lazy)
+
+def test_lazy_row_dirty_only_when_value_changes():
+	engine = new_engine()
+	row = engine.add(90.0, 100.0, 0.0, 0.0, params(LINEAR, slope=4.0), True, TIME_STEP, True)
+	engine.register(row, 0.0)
+	clock = engine.get_clock()
+
+	dirty = list()
+	for k in range(6):
+		dirty.append(row in engine.snapshot()[2])
+		clock.advance_to(clock.now() + TIME_STEP)
+
+	# 90, 94, 98 and then saturated at 100
+	assert dirty == [True, True, True, True, False, False]
+	assert engine.is_evolving(row)
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_copy_row_continues_exponential_curve(lazy):
+	engine = new_engine()
+	clock = engine.get_clock()
+	old = engine.add(0.0, 1e300, 0.0, 0.0, params(EXPONENTIAL, tau=10.0), True, TIME_STEP, lazy)
+	engine.register(old, clock.now())
+
+	for k in range(6):
+		engine.tick(clock.now())
+		clock.advance_to(clock.now() + TIME_STEP)
+	engine.tick(clock.now())
+	fn_time = engine.get_fn_time(old)
+
+	# A rebuilt evolution starts from the database initial value and continues from the replaced one
+	new = engine.add(0.0, 1e300, 0.0, 0.0, params(EXPONENTIAL, tau=10.0), True, TIME_STEP, lazy)
+	engine.register(new, clock.now())
+	engine.copy_row(new, old)
+	engine.tick(clock.now())
+
+	for k in range(1, STEPS + 1):
+		clock.advance_to(clock.now() + TIME_STEP)
+		engine.tick(clock.now())
+		assert engine.get_fn_time(new) == fn_time + k
+		np.testing.assert_allclose(engine.get_value(new), np.exp((fn_time + k)/10.0), rtol=1e-12)
+		np.testing.assert_allclose(engine.get_value(new), engine.get_value(old), rtol=1e-12)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_left
+
+BUCKETS = [0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0] # Histogram upper edges as fractions of the period
+
+class TickStats():
+	"""
+	Tick Statistics Class
+	Tick latency histogram and overrun counters of a fixed rate loop
+	"""
+	def __init__(self, period, buckets=BUCKETS):
+
+		self.__period = period
+		self.__edges = [b*period for b in buckets] # Histogram upper edges in seconds
+
+		self.__ticks = 0
+		self.__overruns = 0 # Ticks that ended after the next deadline
+		self.__skipped = 0 # Deadlines dropped by the skip policy
+		self.__total_latency = 0.0
+		self.__max_latency = 0.0
+		self.__histogram = [0]*(len(buckets) + 1) # Last bucket holds latencies above every edge
+
+	def record(self, latency, overrun, skipped=0):
+		"""
+		Records one tick
+		@ latency float: seconds spent in the tick
+		@ overrun bool: the tick ended after the next deadline
+		@ skipped int: deadlines dropped after the tick
+		"""
+		self.__ticks += 1
+		self.__total_latency += latency
+		self.__max_latency = max(self.__max_latency, latency)
+		self.__histogram[bisect_left(self.__edges, latency)] += 1
+
+		if overrun:
+			self.__overruns += 1
+		self.__skipped += skipped
+
+	def get_stats(self):
+		"""
+		Returns a copy of the counters
+		@ returns dict: ticks, overruns, skipped, mean and max latency and histogram
+		"""
+		mean = 0.0
+		if self.__ticks:
+			mean = self.__total_latency/self.__ticks
+
+		return {"ticks": self.__ticks, "overruns": self.__overruns, "skipped": self.__skipped, "mean_latency": mean, "max_latency": self.__max_latency, "histogram_edges": list(self.__edges), "histogram": list(self.__histogram)}